@@ -1,5 +1,11 @@
-import poc_2048_gui               
 import random
+import struct
+
+# The GUI is only available inside CodeSkulptor
+try:
+    import poc_2048_gui
+except ImportError:
+    poc_2048_gui = None
 
 # Directions
 UP = 1
@@ -12,39 +18,54 @@ OFFSETS = {UP: (1, 0),
            DOWN: (-1, 0), 
            LEFT: (0, 1), 
            RIGHT: (0, -1)} 
+
+# Values for new tiles, 2 90% of the time and 4 10% of the time
+NEW_TILES = [2] * 9 + [4] * 1
+
+# Header of the binary state encoding: height, width, bits per cell, score.
+# The header is followed by the base 2 exponent of every tile in row
+# major order, two to a byte when they all fit in 4 bits.
+STATE_HEADER = struct.Struct(">BBBQ")
    
 def merge(line):
     """
     Helper function that merges a single row or column in 2048
     """
-    temp_list = [0 for dummy_i in range(len(line))]
-    temp_list_i = 0
-    zero_flag = True
-    for dummy_i in range(len(line) - 1):   
-        zero_flag = True
-        if line[dummy_i] == 0:
+    return merge_with_score(line)[0]
+
+def merge_with_score(line, out = None):
+    """
+    Merge a single row or column like merge() in one pass.
+    Writes the merged line into out, a list at least as long as line,
+    or a new list if out is None.  out may be line itself to merge in
+    place: a tile is never written ahead of the tile being read.
+    Returns a tuple of the merged line and the sum of the merged tiles.
+    """
+    if out is None:
+        out = [0] * len(line)
+    out_i = 0
+    score = 0
+    # Tile waiting to see whether the next tile merges with it
+    pending = 0
+    for value in line:
+        if value == 0:
             continue
-        else:    
-            for dummy_i_2 in range(dummy_i + 1, len(line)):
-                if line[dummy_i_2] == 0:
-                    continue
-                elif line[dummy_i] == line[dummy_i_2]:
-                    temp_list[temp_list_i] = line[dummy_i] + line[dummy_i_2]
-                    line[dummy_i_2] = 0
-                    temp_list_i += 1
-                    zero_flag = False
-                    break
-                elif line[dummy_i] != line[dummy_i_2]:
-                    temp_list[temp_list_i] = line[dummy_i]
-                    temp_list_i += 1
-                    zero_flag = False
-                    break
-            if zero_flag == True:                
-                temp_list[temp_list_i] = line[dummy_i]
-                break
-    if zero_flag == False or line[-1] != 0:
-        temp_list[temp_list_i] = line[-1]
-    return temp_list
+        if value == pending:
+            out[out_i] = value + value
+            score += value + value
+            out_i += 1
+            pending = 0
+        else:
+            if pending:
+                out[out_i] = pending
+                out_i += 1
+            pending = value
+    if pending:
+        out[out_i] = pending
+        out_i += 1
+    for idx in range(out_i, len(line)):
+        out[idx] = 0
+    return out, score
 
 class TwentyFortyEight:
     """
@@ -59,12 +80,66 @@ class TwentyFortyEight:
                                 DOWN: [(self.row - 1, i) for i in range(self.col)],
                                 LEFT: [(i, 0) for i in range(self.row)],
                                 RIGHT: [(i, self.col - 1) for i in range(self.row)]}
-        
+        # Squares of every row or column, starting from the side tiles move to
+        self._lines = {}
+        for direction in OFFSETS:
+            offset = OFFSETS[direction]
+            if direction == LEFT or direction == RIGHT:
+                row_or_col = self.col
+            else:
+                row_or_col = self.row
+            self._lines[direction] = [[(entry[0] + offset[0] * i, entry[1] + offset[1] * i)
+                                       for i in range(row_or_col)]
+                                      for entry in self.initial_entries[direction]]
+        self._clear_empty()
+        self._score = 0
+        self._move_score = 0
+        self._max_tile = 0
+
+    def _clear_empty(self):
+        """
+        Mark every square as empty.
+        Empty squares are kept as cell numbers (row * width + col) in
+        an unordered list, with a dict giving each one's position in it.
+        """
+        self._empty = list(range(self.row * self.col))
+        self._empty_index = dict([(cell, cell) for cell in self._empty])
+
+    def _update_empty(self, row, col, value):
+        """
+        Record that square row, col is about to switch between empty
+        and occupied, value being its new content.
+        """
+        cell = row * self.col + col
+        if value == 0:
+            self._empty_index[cell] = len(self._empty)
+            self._empty.append(cell)
+        else:
+            # Fill the hole with the last entry to keep removal O(1)
+            position = self._empty_index.pop(cell)
+            last = self._empty.pop()
+            if last != cell:
+                self._empty[position] = last
+                self._empty_index[last] = position
+
+    def _rebuild_empty(self):
+        """
+        Recompute the empty squares from the board.
+        """
+        self._empty = [row * self.col + col for row in range(self.row)
+                       for col in range(self.col) if self.board[row][col] == 0]
+        self._empty_index = dict([(self._empty[position], position)
+                                  for position in range(len(self._empty))])
+
     def reset(self):
         """
         Empty the grid
         """
         self.board = [[0 for dummy_row in range(self.col)] for dummy_col in range(self.row)]
+        self._clear_empty()
+        self._score = 0
+        self._move_score = 0
+        self._max_tile = 0
         self.new_tile()
         self.new_tile()
     
@@ -92,50 +167,123 @@ class TwentyFortyEight:
         """
         return self.col
                             
+    def get_score(self):
+        """
+        Get the sum of all tiles merged since the last reset.
+        """
+        return self._score
+
+    def get_move_score(self):
+        """
+        Get the sum of the tiles merged by the last move.
+        """
+        return self._move_score
+
+    def get_max_tile(self):
+        """
+        Get the value of the largest tile on the board.
+        """
+        return self._max_tile
+
+    def is_full(self):
+        """
+        Return True if there is no empty square left.
+        """
+        return len(self._empty) == 0
+
+    def can_move(self, direction):
+        """
+        Return True if moving in the given direction would change the board.
+        A line changes when a tile has an empty square in front of it or
+        equals the tile directly in front of it.
+        """
+        board = self.board
+        for line in self._lines[direction]:
+            seen_zero = False
+            prev = 0
+            for row, col in line:
+                value = board[row][col]
+                if value == 0:
+                    seen_zero = True
+                elif seen_zero or value == prev:
+                    return True
+                else:
+                    prev = value
+        return False
+
+    def legal_moves(self):
+        """
+        Return the list of directions that would change the board.
+        """
+        return [direction for direction in (UP, DOWN, LEFT, RIGHT)
+                if self.can_move(direction)]
+
+    def is_game_over(self):
+        """
+        Return True if no direction changes the board, the same as
+        not legal_moves().  An empty board has no legal move.
+        """
+        # A tile next to an empty square can always move into it, so a
+        # board with empty squares is only stuck when it has no tiles.
+        if self._empty:
+            return len(self._empty) == self.row * self.col
+        # With no empty square only merges are possible, and a pair of
+        # equal neighbours merges both ways along its row or column.
+        return not self.can_move(LEFT) and not self.can_move(UP)
+
     def move(self, direction):
         """
         Move all tiles in the given direction and add
         a new tile if any tiles moved.
+        Returns True if any tiles moved.
+        The merged tiles are added to the score.
         """
-        initial_entries = self.initial_entries[direction]
-        offset = OFFSETS[direction]
+        board = self.board
+        changed = False
+        move_score = 0
+        for line in self._lines[direction]:
+            values = [board[row][col] for row, col in line]
+            temp_list, score = merge_with_score(values, values)
+            move_score += score
+            for count_i in range(len(line)):
+                row, col = line[count_i]
+                value = temp_list[count_i]
+                if board[row][col] != value:
+                    changed = True
+                    if (board[row][col] == 0) != (value == 0):
+                        self._update_empty(row, col, value)
+                    if value > self._max_tile:
+                        self._max_tile = value
+                    board[row][col] = value
 
-        if direction == 3 or direction == 4:
-            row_or_col = self.col 
-        else:
-            row_or_col = self.row 
-        
-        for entry in initial_entries:
-            temp_list = merge([self.board[entry[0] + offset[0] * i][entry[1] + offset[1] * i] for i in range(row_or_col)])           
-            for count_i in range(row_or_col):
-                self.board[entry[0] + offset[0] * count_i][entry[1] + offset[1] * count_i] = temp_list[count_i] 
-                                
-        self.new_tile()
+        self._move_score = move_score
+        self._score += move_score
+        if changed:
+            self.new_tile()
+        return changed
         
     def new_tile(self):
         """
         Create a new tile in a randomly selected empty square.  
         The tile should be 2 90% of the time and 4 10% of the time.
         """
-        zero_number = 0
-        nonzero_flag = False
-        for col in range(self.col):
-            for row in range(self.row):
-                if self.board[row][col] == 0:
-                    zero_number += 1
-        if zero_number > 0:
-            nonzero_flag = True
-        while nonzero_flag:                  
-            number = random.choice(range(self.row * self.col))
-            if self.board[number / (self.col)][number % self.col] == 0:
-                self.board[number / (self.col)][number % self.col] = random.choice([2] * 9 + [4] * 1)
-                nonzero_flag = False
-       
+        if self._empty:
+            number = random.choice(self._empty)
+            self.set_tile(number // self.col, number % self.col, random.choice(NEW_TILES))
+
     def set_tile(self, row, col, value):
         """
         Set the tile at position row, col to have the given value.
         """        
+        old_value = self.board[row][col]
+        if (old_value == 0) != (value == 0):
+            self._update_empty(row, col, value)
         self.board[row][col] = value
+        if value > self._max_tile:
+            self._max_tile = value
+        elif old_value == self._max_tile and value < old_value:
+            # The largest tile may have been overwritten, look again
+            self._max_tile = max([max(board_row) for board_row in self.board])
 
     def get_tile(self, row, col):
         """
@@ -143,4 +291,59 @@ class TwentyFortyEight:
         """
         return self.board[row][col]       
 
-poc_2048_gui.run_gui(TwentyFortyEight(4, 4))
+    def snapshot(self):
+        """
+        Return an immutable copy of the game state for restore().
+        """
+        return (tuple([tuple(board_row) for board_row in self.board]),
+                self._score, self._max_tile)
+
+    def restore(self, snapshot):
+        """
+        Return the game to a state produced by snapshot().
+        """
+        rows, self._score, self._max_tile = snapshot
+        self.board = [list(board_row) for board_row in rows]
+        self._move_score = 0
+        self._rebuild_empty()
+
+    def to_bytes(self):
+        """
+        Return the compact binary encoding of the game state.
+        """
+        exponents = [value.bit_length() - 1 if value else 0
+                     for board_row in self.board for value in board_row]
+        if max(exponents) < 16:
+            bits = 4
+            if len(exponents) % 2:
+                exponents.append(0)
+            cells = [exponents[idx] << 4 | exponents[idx + 1]
+                     for idx in range(0, len(exponents), 2)]
+        else:
+            bits = 8
+            cells = exponents
+        return (STATE_HEADER.pack(self.row, self.col, bits, self._score)
+                + bytes(bytearray(cells)))
+
+def from_bytes(data):
+    """
+    Build a TwentyFortyEight game from the output of to_bytes().
+    """
+    height, width, bits, score = STATE_HEADER.unpack_from(data)
+    cells = bytearray(data[STATE_HEADER.size:])
+    if bits == 4:
+        exponents = []
+        for cell in cells:
+            exponents.append(cell >> 4)
+            exponents.append(cell & 15)
+    else:
+        exponents = list(cells)
+    game = TwentyFortyEight(height, width)
+    game.restore((tuple([tuple([1 << exp if exp else 0
+                                for exp in exponents[row * width:(row + 1) * width]])
+                         for row in range(height)]),
+                  score, 1 << max(exponents) if max(exponents) else 0))
+    return game
+
+if poc_2048_gui is not None:
+    poc_2048_gui.run_gui(TwentyFortyEight(4, 4))
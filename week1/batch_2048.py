@@ -0,0 +1,216 @@
+"""
+Batched 2048 simulator
+
+Holds many boards as one (games, height, width) NumPy array and moves
+them all at once.  The merge rules are the same as merge() in 2048.py.
+"""
+
+import time
+import numpy as np
+
+# Directions
+UP = 1
+DOWN = 2
+LEFT = 3
+RIGHT = 4
+DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+
+def merge_lines(lines):
+    """
+    Merge every row of a (count, length) array towards column 0.
+    Returns a new array, the input is left unchanged.
+    """
+    lines = np.array(lines)
+    length = lines.shape[1]
+    # Slide tiles to the front, keeping their order
+    order = np.argsort(lines == 0, axis=1, kind="mergesort")
+    lines = lines[np.arange(lines.shape[0])[:, None], order]
+    # Combine equal neighbours from the front, each tile merging at most once
+    for idx in range(length - 1):
+        same = (lines[:, idx] != 0) & (lines[:, idx] == lines[:, idx + 1])
+        lines[same, idx] *= 2
+        lines[same, idx + 1] = 0
+    # Close the gaps left by merged tiles
+    order = np.argsort(lines == 0, axis=1, kind="mergesort")
+    return lines[np.arange(lines.shape[0])[:, None], order]
+
+def shift_boards(boards, direction):
+    """
+    Slide and merge a (games, height, width) array in one direction.
+    Returns a new array, no tiles are added.
+    """
+    if direction == UP or direction == DOWN:
+        oriented = boards.transpose(0, 2, 1)
+    else:
+        oriented = boards
+    if direction == RIGHT or direction == DOWN:
+        oriented = oriented[:, :, ::-1]
+    shape = oriented.shape
+    merged = merge_lines(oriented.reshape(-1, shape[2])).reshape(shape)
+    if direction == RIGHT or direction == DOWN:
+        merged = merged[:, :, ::-1]
+    if direction == UP or direction == DOWN:
+        merged = merged.transpose(0, 2, 1)
+    return np.ascontiguousarray(merged)
+
+class BatchTwentyFortyEight:
+    """
+    Many independent games of 2048 advanced in lock step.
+    """
+
+    def __init__(self, num_games, grid_height, grid_width, seed = None):
+        self._num_games = num_games
+        self._height = grid_height
+        self._width = grid_width
+        self._rng = np.random.RandomState(seed)
+        self._boards = np.zeros((num_games, grid_height, grid_width), dtype=np.int64)
+
+    def reset(self):
+        """
+        Empty every grid and add two tiles to each.
+        """
+        self._boards[:] = 0
+        self.new_tile()
+        self.new_tile()
+
+    def get_num_games(self):
+        """
+        Get the number of boards in the batch.
+        """
+        return self._num_games
+
+    def get_grid_height(self):
+        """
+        Get the height of the boards.
+        """
+        return self._height
+
+    def get_grid_width(self):
+        """
+        Get the width of the boards.
+        """
+        return self._width
+
+    def get_boards(self):
+        """
+        Return the (games, height, width) array of tile values.
+        """
+        return self._boards
+
+    def get_tile(self, game, row, col):
+        """
+        Return the value of the tile at row, col of one game.
+        """
+        return int(self._boards[game, row, col])
+
+    def set_tile(self, game, row, col, value):
+        """
+        Set the tile at row, col of one game to the given value.
+        """
+        self._boards[game, row, col] = value
+
+    def move(self, directions, active = None):
+        """
+        Move the boards and then add a tile to each one that changed,
+        like TwentyFortyEight.move.  directions is either a single
+        direction or one direction per game.  Only games selected by
+        the boolean mask active are touched.
+        Returns a boolean array telling which boards moved.
+        """
+        if active is None:
+            active = np.ones(self._num_games, dtype=bool)
+        directions = np.broadcast_to(np.asarray(directions), (self._num_games,))
+        before = self._boards.copy()
+        for direction in DIRECTIONS:
+            selected = active & (directions == direction)
+            if selected.any():
+                self._boards[selected] = shift_boards(self._boards[selected], direction)
+        moved = (self._boards != before).any(axis=(1, 2))
+        self.new_tile(moved)
+        return moved
+
+    def new_tile(self, active = None):
+        """
+        Create a new tile in a random empty square of every selected game.
+        The tile should be 2 90% of the time and 4 10% of the time.
+        """
+        flat = self._boards.reshape(self._num_games, -1)
+        empty = flat == 0
+        if active is not None:
+            empty &= active[:, None]
+        # A uniform key per empty cell, the largest one wins
+        keys = np.where(empty, self._rng.random_sample(flat.shape), -1.0)
+        cells = keys.argmax(axis=1)
+        games = np.nonzero(empty.any(axis=1))[0]
+        values = np.where(self._rng.random_sample(len(games)) < 0.9, 2, 4)
+        flat[games, cells[games]] = values
+
+    def is_game_over(self):
+        """
+        Return a boolean array telling which boards have no move left.
+        """
+        boards = self._boards
+        full = (boards != 0).all(axis=(1, 2))
+        rows = (boards[:, :, 1:] == boards[:, :, :-1]).any(axis=(1, 2))
+        cols = (boards[:, 1:, :] == boards[:, :-1, :]).any(axis=(1, 2))
+        return full & ~rows & ~cols
+
+def play_random_games(batch, seed = None):
+    """
+    Play every game of batch to the end with uniformly random moves.
+    Returns the number of moves made in each game.
+    """
+    rng = np.random.RandomState(seed)
+    batch.reset()
+    moves = np.zeros(batch.get_num_games(), dtype=np.int64)
+    active = ~batch.is_game_over()
+    while active.any():
+        directions = rng.randint(UP, RIGHT + 1, batch.get_num_games())
+        batch.move(directions, active)
+        moves += active
+        active &= ~batch.is_game_over()
+    return moves
+
+def play_looped_games(game_class, num_games, grid_height, grid_width):
+    """
+    Play num_games random games one at a time with game_class.
+    Returns the total number of moves made.
+    """
+    total = 0
+    rng = np.random.RandomState()
+    for dummy_game in range(num_games):
+        game = game_class(grid_height, grid_width)
+        game.reset()
+        while not game.is_game_over():
+            game.move(int(rng.randint(UP, RIGHT + 1)))
+            total += 1
+    return total
+
+def benchmark(num_games, grid_height, grid_width, game_class = None):
+    """
+    Time random games played as one batch and, if game_class is given,
+    one at a time.  Returns a dictionary of games/sec figures.
+    """
+    results = {"games": num_games,
+               "height": grid_height,
+               "width": grid_width}
+    batch = BatchTwentyFortyEight(num_games, grid_height, grid_width)
+    start = time.time()
+    moves = play_random_games(batch)
+    elapsed = time.time() - start
+    results["batch_games_per_sec"] = num_games / elapsed
+    results["batch_moves_per_sec"] = moves.sum() / elapsed
+    if game_class is not None:
+        start = time.time()
+        total = play_looped_games(game_class, num_games, grid_height, grid_width)
+        elapsed = time.time() - start
+        results["loop_games_per_sec"] = num_games / elapsed
+        results["loop_moves_per_sec"] = total / elapsed
+        results["speedup"] = (results["batch_games_per_sec"]
+                              / results["loop_games_per_sec"])
+    return results
+
+if __name__ == "__main__":
+    GAME_CLASS = __import__("2048").TwentyFortyEight
+    for SIZE in [4, 5]:
+        print(benchmark(200, SIZE, SIZE, GAME_CLASS))
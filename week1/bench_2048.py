@@ -0,0 +1,224 @@
+"""
+Benchmarks for the 2048 engine in 2048.py
+
+    python bench_2048.py --output today.json --compare yesterday.json
+
+Every benchmark is run a few times after a warmup round and reported as
+operations per second (mean and standard deviation over the rounds).
+Results can be saved as JSON and compared against an earlier run.
+"""
+
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import timeit
+
+ENGINE = __import__("2048")
+
+DIRECTIONS = [("up", ENGINE.UP), ("down", ENGINE.DOWN),
+              ("left", ENGINE.LEFT), ("right", ENGINE.RIGHT)]
+
+def rejection_new_tile(game):
+    """
+    The previous new_tile: count the zeros, then draw random squares
+    until an empty one comes up.  Kept for comparison only.
+    """
+    rows = game.get_grid_height()
+    cols = game.get_grid_width()
+    zero_number = 0
+    for col in range(cols):
+        for row in range(rows):
+            if game.get_tile(row, col) == 0:
+                zero_number += 1
+    while zero_number > 0:
+        number = random.choice(range(rows * cols))
+        if game.get_tile(number // cols, number % cols) == 0:
+            game.set_tile(number // cols, number % cols, random.choice(ENGINE.NEW_TILES))
+            zero_number = 0
+
+def filled_game(size, fill):
+    """
+    Return a size x size game with the given fraction of squares taken.
+    """
+    game = ENGINE.TwentyFortyEight(size, size)
+    cells = [(row, col) for row in range(size) for col in range(size)]
+    for row, col in random.sample(cells, int(fill * len(cells))):
+        game.set_tile(row, col, 2)
+    return game
+
+def midgame_snapshots(size, count):
+    """
+    Return count snapshots of size x size games after random play.
+    """
+    snapshots = []
+    game = ENGINE.TwentyFortyEight(size, size)
+    while len(snapshots) < count:
+        game.reset()
+        for dummy_move in range(size * size):
+            if game.is_game_over():
+                break
+            game.move(random.choice(game.legal_moves()))
+        snapshots.append(game.snapshot())
+    return snapshots
+
+def measure(setup, operation, calls, rounds = 5, warmup = 1):
+    """
+    Time operation(setup()) calls times per round, excluding setup.
+    The first warmup rounds are thrown away.
+    Returns a dictionary with the mean and standard deviation of the
+    operations per second over the remaining rounds.
+    """
+    rates = []
+    for round_number in range(warmup + rounds):
+        elapsed = 0.0
+        for dummy_call in range(calls):
+            arg = setup()
+            start = timeit.default_timer()
+            operation(arg)
+            elapsed += timeit.default_timer() - start
+        if round_number >= warmup:
+            rates.append(calls / elapsed)
+    mean = sum(rates) / len(rates)
+    variance = sum([(rate - mean) ** 2 for rate in rates]) / len(rates)
+    return {"ops_per_sec": mean,
+            "stdev": math.sqrt(variance),
+            "rounds": rounds,
+            "calls": calls}
+
+def bench_merge(size, calls, rounds):
+    """
+    merge() on random lines of the given length.
+    """
+    lines = [[random.choice([0, 0, 2, 2, 4, 8]) for dummy_idx in range(size)]
+             for dummy_line in range(64)]
+    return measure(lambda: list(random.choice(lines)), ENGINE.merge, calls, rounds)
+
+def bench_move(size, direction, calls, rounds):
+    """
+    move() in one direction from random mid-game positions.
+    """
+    game = ENGINE.TwentyFortyEight(size, size)
+    snapshots = midgame_snapshots(size, 16)
+
+    def setup():
+        """
+        Restore a random position.
+        """
+        game.restore(random.choice(snapshots))
+        return direction
+    return measure(setup, game.move, calls, rounds)
+
+def bench_new_tile(size, fill, calls, rounds, new_tile = None):
+    """
+    new_tile() at a fixed fill level; the added tile is removed again
+    outside the timed section.
+    """
+    if new_tile is None:
+        new_tile = ENGINE.TwentyFortyEight.new_tile
+    game = filled_game(size, fill)
+    previous = []
+
+    def setup():
+        """
+        Remove the tile added by the previous call.
+        """
+        if previous:
+            before = previous.pop()
+            for row in range(size):
+                for col in range(size):
+                    if game.get_tile(row, col) != before[row][col]:
+                        game.set_tile(row, col, 0)
+        previous.append(game.snapshot()[0])
+        return game
+    return measure(setup, new_tile, calls, rounds)
+
+def bench_games(size, games, rounds):
+    """
+    Whole games with uniformly random legal moves.
+    """
+    def play(dummy_arg):
+        """
+        Play one game to the end.
+        """
+        game = ENGINE.TwentyFortyEight(size, size)
+        game.reset()
+        while not game.is_game_over():
+            game.move(random.choice(game.legal_moves()))
+    return measure(lambda: None, play, games, rounds)
+
+def run_suite(sizes, game_sizes, fills, calls, games, rounds):
+    """
+    Run every benchmark and return a dictionary of results by name.
+    """
+    results = {}
+    for size in sizes:
+        results["merge/%d" % size] = bench_merge(size, calls, rounds)
+        for name, direction in DIRECTIONS:
+            results["move_%s/%dx%d" % (name, size, size)] = bench_move(size, direction, calls, rounds)
+        for fill in fills:
+            results["new_tile/%dx%d/fill%.2f" % (size, size, fill)] = bench_new_tile(size, fill, calls, rounds)
+            results["new_tile_rejection/%dx%d/fill%.2f" % (size, size, fill)] = \
+                bench_new_tile(size, fill, calls, rounds, rejection_new_tile)
+    for size in game_sizes:
+        results["random_game/%dx%d" % (size, size)] = bench_games(size, games, rounds)
+    return results
+
+def compare(results, baseline):
+    """
+    Return lines comparing results with a saved baseline run.
+    """
+    lines = []
+    for name in sorted(results):
+        if name in baseline:
+            ratio = results[name]["ops_per_sec"] / baseline[name]["ops_per_sec"]
+            lines.append("%-32s %12.1f %12.1f  x%.2f" % (name, baseline[name]["ops_per_sec"],
+                                                          results[name]["ops_per_sec"], ratio))
+    return lines
+
+def parse_args(argv):
+    """
+    Parse the command line.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the 2048 engine.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--game-sizes", type=int, nargs="+", default=[4, 5],
+                        help="grid sizes for whole random games")
+    parser.add_argument("--fills", type=float, nargs="+", default=[0.0, 0.5, 0.9, 0.99])
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="save results to this JSON file")
+    parser.add_argument("--compare", default=None, help="JSON file of an earlier run")
+    return parser.parse_args(argv)
+
+def main(argv):
+    """
+    Run the suite, print it and optionally save and compare it.
+    """
+    options = parse_args(argv)
+    random.seed(options.seed)
+    results = run_suite(options.sizes, options.game_sizes, options.fills,
+                        options.calls, options.games, options.rounds)
+    for name in sorted(results):
+        print("%-32s %12.1f ops/sec  +- %.1f" % (name, results[name]["ops_per_sec"],
+                                                 results[name]["stdev"]))
+    if options.output is not None:
+        output = open(options.output, "w")
+        json.dump({"time": time.time(),
+                   "python": platform.python_version(),
+                   "results": results}, output, indent=1, sort_keys=True)
+        output.close()
+    if options.compare is not None:
+        baseline = json.load(open(options.compare))["results"]
+        print("")
+        print("%-32s %12s %12s" % ("benchmark", "baseline", "current"))
+        for line in compare(results, baseline):
+            print(line)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
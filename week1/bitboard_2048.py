@@ -0,0 +1,392 @@
+"""
+Packed bitboard backend for 2048
+
+Every tile is stored as its base 2 exponent in a 4 bit cell, so a 4x4
+board fits in a single 64 bit integer.  Cell (row, col) lives at bit
+offset (row * width + col) * CELL_BITS.  Moves are computed by looking
+up every packed row (or column) in precomputed merge tables.
+"""
+
+import random
+
+# Directions
+UP = 1
+DOWN = 2
+LEFT = 3
+RIGHT = 4
+
+# Cell layout
+CELL_BITS = 4
+CELL_MASK = (1 << CELL_BITS) - 1
+MAX_EXPONENT = CELL_MASK
+
+# Lines up to this length get a fully precomputed table (16 ** 4 rows),
+# longer lines are merged on demand and memoized.
+TABLE_LENGTH = 4
+
+# Table entry for a line whose merge would not fit in a cell
+OVERFLOW = -1
+
+# Tile value <-> exponent conversions
+EXPONENTS = dict([(0, 0)] + [(2 ** exp, exp) for exp in range(1, MAX_EXPONENT + 1)])
+VALUES = [0] + [2 ** exp for exp in range(1, MAX_EXPONENT + 1)]
+
+def merge_exponents(line):
+    """
+    Merge a line of exponents towards index 0 using the rules of merge().
+    Returns a new list of the same length.
+    """
+    result = []
+    last = 0
+    for exp in line:
+        if exp == 0:
+            continue
+        if exp == last:
+            result[-1] = exp + 1
+            last = 0
+        else:
+            result.append(exp)
+            last = exp
+    result.extend([0] * (len(line) - len(result)))
+    return result
+
+def pack_line(line):
+    """
+    Pack a list of exponents into an integer, index 0 in the low bits.
+    """
+    packed = 0
+    for idx in range(len(line)):
+        packed |= line[idx] << (idx * CELL_BITS)
+    return packed
+
+def unpack_line(packed, length):
+    """
+    Unpack an integer produced by pack_line into a list of exponents.
+    """
+    return [(packed >> (idx * CELL_BITS)) & CELL_MASK for idx in range(length)]
+
+def _merge_packed(packed, length, reverse):
+    """
+    Merge a packed line towards its low end, or its high end if reverse.
+    Returns OVERFLOW if the result does not fit in the cells.
+    """
+    line = unpack_line(packed, length)
+    if reverse:
+        line.reverse()
+    merged = merge_exponents(line)
+    if max(merged) > MAX_EXPONENT:
+        return OVERFLOW
+    if reverse:
+        merged.reverse()
+    return pack_line(merged)
+
+def _merge_info(packed, length):
+    """
+    Return (score, top) for merging a packed line in either direction:
+    the sum of the merged tile values and the largest merged exponent.
+    """
+    score = 0
+    top = 0
+    last = 0
+    for exp in unpack_line(packed, length):
+        if exp == 0:
+            continue
+        if exp == last:
+            score += 2 ** (exp + 1)
+            top = max(top, exp + 1)
+            last = 0
+        else:
+            last = exp
+    return score, top
+
+class _LazyTable(dict):
+    """
+    Table for long lines, filled in as rows are encountered.
+    """
+
+    def __init__(self, function):
+        dict.__init__(self)
+        self._function = function
+
+    def __missing__(self, packed):
+        value = self._function(packed)
+        self[packed] = value
+        return value
+
+_TABLES = {}
+_INFO_TABLES = {}
+
+def get_tables(length):
+    """
+    Return the (left, right) merge tables for lines of the given length.
+    Tables are built on first use and shared by all boards.
+    """
+    if length not in _TABLES:
+        if length <= TABLE_LENGTH:
+            rows = range(1 << (length * CELL_BITS))
+            _TABLES[length] = ([_merge_packed(row, length, False) for row in rows],
+                               [_merge_packed(row, length, True) for row in rows])
+        else:
+            _TABLES[length] = (_LazyTable(lambda row: _merge_packed(row, length, False)),
+                               _LazyTable(lambda row: _merge_packed(row, length, True)))
+    return _TABLES[length]
+
+def get_info_table(length):
+    """
+    Return the table of _merge_info results for lines of the given length.
+    Merging left or right scores the same pairs, so one table serves both.
+    """
+    if length not in _INFO_TABLES:
+        if length <= TABLE_LENGTH:
+            _INFO_TABLES[length] = [_merge_info(row, length)
+                                    for row in range(1 << (length * CELL_BITS))]
+        else:
+            _INFO_TABLES[length] = _LazyTable(lambda row: _merge_info(row, length))
+    return _INFO_TABLES[length]
+
+def transpose(board, height, width):
+    """
+    Transpose a packed height x width board into a width x height one.
+    """
+    if height == 4 and width == 4:
+        # Swap nibbles across the diagonal with masks, 2x2 blocks first
+        part1 = board & 0xF0F00F0FF0F00F0F
+        part2 = board & 0x0000F0F00000F0F0
+        part3 = board & 0x0F0F00000F0F0000
+        board = part1 | (part2 << 12) | (part3 >> 12)
+        part1 = board & 0xFF00FF0000FF00FF
+        part2 = board & 0x00FF00FF00000000
+        part3 = board & 0x00000000FF00FF00
+        return part1 | (part2 >> 24) | (part3 << 24)
+    result = 0
+    for row in range(height):
+        for col in range(width):
+            cell = (board >> ((row * width + col) * CELL_BITS)) & CELL_MASK
+            result |= cell << ((col * height + row) * CELL_BITS)
+    return result
+
+def _shift_rows(board, num_rows, length, table):
+    """
+    Replace every packed row of the board by its table entry.
+    """
+    row_bits = length * CELL_BITS
+    row_mask = (1 << row_bits) - 1
+    result = 0
+    shift = 0
+    for dummy_row in range(num_rows):
+        merged = table[(board >> shift) & row_mask]
+        if merged == OVERFLOW:
+            raise OverflowError("tile exceeds " + str(VALUES[MAX_EXPONENT]))
+        result |= merged << shift
+        shift += row_bits
+    return result
+
+def shift_board(board, direction, height, width):
+    """
+    Slide and merge all tiles of a packed board in the given direction.
+    Returns the new packed board, no tile is added.
+    """
+    if direction == LEFT or direction == RIGHT:
+        table = get_tables(width)[direction == RIGHT]
+        return _shift_rows(board, height, width, table)
+    table = get_tables(height)[direction == DOWN]
+    columns = _shift_rows(transpose(board, height, width), width, height, table)
+    return transpose(columns, width, height)
+
+def move_info(board, direction, height, width):
+    """
+    Return (score, top) for moving a packed board in the given direction:
+    the sum of the merged tile values and the largest merged exponent.
+    """
+    if direction == LEFT or direction == RIGHT:
+        num_rows, length = height, width
+    else:
+        board = transpose(board, height, width)
+        num_rows, length = width, height
+    table = get_info_table(length)
+    row_bits = length * CELL_BITS
+    row_mask = (1 << row_bits) - 1
+    score = 0
+    top = 0
+    for row in range(num_rows):
+        row_score, row_top = table[(board >> (row * row_bits)) & row_mask]
+        score += row_score
+        if row_top > top:
+            top = row_top
+    return score, top
+
+def empty_cells(board, num_cells):
+    """
+    Return the list of cell indices holding no tile.
+    """
+    return [idx for idx in range(num_cells)
+            if not (board >> (idx * CELL_BITS)) & CELL_MASK]
+
+class BitboardTwentyFortyEight:
+    """
+    Drop-in replacement for TwentyFortyEight backed by a packed integer.
+    """
+
+    def __init__(self, grid_height, grid_width):
+        self._height = grid_height
+        self._width = grid_width
+        self._board = 0
+        self._score = 0
+        self._move_score = 0
+        self._max_exp = 0
+        # Build the merge tables up front rather than on the first move
+        for length in (grid_height, grid_width):
+            get_tables(length)
+            get_info_table(length)
+
+    def reset(self):
+        """
+        Empty the grid
+        """
+        self._board = 0
+        self._score = 0
+        self._move_score = 0
+        self._max_exp = 0
+        self.new_tile()
+        self.new_tile()
+
+    def __str__(self):
+        """
+        Return a string representation of the grid for debugging.
+        """
+        rows = []
+        for row in range(self._height):
+            rows.append(",".join([str(self.get_tile(row, col))
+                                  for col in range(self._width)]))
+        return "\n".join(rows) + "\n"
+
+    def get_grid_height(self):
+        """
+        Get the height of the board.
+        """
+        return self._height
+
+    def get_grid_width(self):
+        """
+        Get the width of the board.
+        """
+        return self._width
+
+    def get_board(self):
+        """
+        Return the packed integer representation of the board.
+        """
+        return self._board
+
+    def get_score(self):
+        """
+        Get the sum of all tiles merged since the last reset.
+        """
+        return self._score
+
+    def get_move_score(self):
+        """
+        Get the sum of the tiles merged by the last move.
+        """
+        return self._move_score
+
+    def get_max_tile(self):
+        """
+        Get the value of the largest tile on the board.
+        """
+        return VALUES[self._max_exp]
+
+    def can_move(self, direction):
+        """
+        Return True if moving in the given direction would change the board.
+        A move that would merge past the largest tile counts as legal;
+        move() raises OverflowError for it.
+        """
+        try:
+            return shift_board(self._board, direction, self._height, self._width) != self._board
+        except OverflowError:
+            return True
+
+    def legal_moves(self):
+        """
+        Return the list of directions that would change the board.
+        """
+        return [direction for direction in (UP, DOWN, LEFT, RIGHT)
+                if self.can_move(direction)]
+
+    def is_game_over(self):
+        """
+        Return True if no direction changes the board, the same as
+        not legal_moves().  An empty board has no legal move.
+        """
+        return not self.can_move(LEFT) and not self.can_move(UP) \
+            and not self.can_move(RIGHT) and not self.can_move(DOWN)
+
+    def move(self, direction):
+        """
+        Move all tiles in the given direction and add
+        a new tile if any tiles moved.
+        Returns True if any tiles moved.
+        The merged tiles are added to the score.
+        Raises OverflowError, leaving the game unchanged, if a merge
+        would make a tile larger than the cells can hold.
+        """
+        board = shift_board(self._board, direction, self._height, self._width)
+        if board == self._board:
+            self._move_score = 0
+            return False
+        score, top = move_info(self._board, direction, self._height, self._width)
+        self._move_score = score
+        self._score += score
+        if top > self._max_exp:
+            self._max_exp = top
+        self._board = board
+        self.new_tile()
+        return True
+
+    def new_tile(self):
+        """
+        Create a new tile in a randomly selected empty square.
+        The tile should be 2 90% of the time and 4 10% of the time.
+        """
+        empty = empty_cells(self._board, self._height * self._width)
+        if empty:
+            exp = random.choice([1] * 9 + [2] * 1)
+            self._board |= exp << (random.choice(empty) * CELL_BITS)
+            if exp > self._max_exp:
+                self._max_exp = exp
+
+    def set_tile(self, row, col, value):
+        """
+        Set the tile at position row, col to have the given value.
+        """
+        if value not in EXPONENTS:
+            raise ValueError("unsupported tile value " + str(value))
+        shift = (row * self._width + col) * CELL_BITS
+        old_exp = (self._board >> shift) & CELL_MASK
+        exp = EXPONENTS[value]
+        self._board = (self._board & ~(CELL_MASK << shift)) | (exp << shift)
+        if exp > self._max_exp:
+            self._max_exp = exp
+        elif old_exp == self._max_exp and exp < old_exp:
+            # The largest tile may have been overwritten, look again
+            self._max_exp = max(unpack_line(self._board, self._height * self._width))
+
+    def get_tile(self, row, col):
+        """
+        Return the value of the tile at position row, col.
+        """
+        return VALUES[(self._board >> ((row * self._width + col) * CELL_BITS)) & CELL_MASK]
+
+    def snapshot(self):
+        """
+        Return an immutable copy of the game state for restore().
+        """
+        return (self._board, self._score, self._max_exp)
+
+    def restore(self, snapshot):
+        """
+        Return the game to a state produced by snapshot().
+        """
+        self._board, self._score, self._max_exp = snapshot
+        self._move_score = 0
@@ -0,0 +1,278 @@
+"""
+Expectimax player for 2048
+
+Searches over packed boards from bitboard_2048, so it can drive either
+TwentyFortyEight or BitboardTwentyFortyEight through get_tile/move.
+"""
+
+import time
+import bitboard_2048 as bitboard
+
+# Directions, in the order they are tried
+DIRECTIONS = [bitboard.UP, bitboard.DOWN, bitboard.LEFT, bitboard.RIGHT]
+
+# Tile spawn probabilities, as exponents (2 -> 1, 4 -> 2)
+SPAWNS = [(1, 0.9), (2, 0.1)]
+
+# Heuristic weights
+EMPTY_WEIGHT = 270.0
+MERGE_WEIGHT = 700.0
+MONOTONIC_WEIGHT = 47.0
+LOST_PENALTY = 200000.0
+
+# Check the clock once every this many nodes
+CLOCK_INTERVAL = 256
+
+class _Timeout(Exception):
+    """
+    Raised inside the search when the time budget runs out.
+    """
+    pass
+
+def score_line(line):
+    """
+    Heuristic value of a single row or column of exponents.
+    Rewards empty cells, adjacent equal tiles and monotonic lines.
+    """
+    empty = 0
+    merges = 0
+    prev = 0
+    for exp in line:
+        if exp == 0:
+            empty += 1
+        elif exp == prev:
+            merges += 1
+        if exp != 0:
+            prev = exp
+    left = 0
+    right = 0
+    for idx in range(len(line) - 1):
+        if line[idx] > line[idx + 1]:
+            left += line[idx] ** 4 - line[idx + 1] ** 4
+        else:
+            right += line[idx + 1] ** 4 - line[idx] ** 4
+    return (EMPTY_WEIGHT * empty + MERGE_WEIGHT * merges
+            - MONOTONIC_WEIGHT * min(left, right))
+
+class _LineScores(dict):
+    """
+    Memoized score_line keyed on packed lines of a fixed length.
+    """
+
+    def __init__(self, length):
+        dict.__init__(self)
+        self._length = length
+
+    def __missing__(self, packed):
+        value = score_line(bitboard.unpack_line(packed, self._length))
+        self[packed] = value
+        return value
+
+def board_from_game(game):
+    """
+    Return the packed board for a game object with the 2048 interface.
+    Raises OverflowError for a tile larger than the cells can hold.
+    """
+    if hasattr(game, "get_board"):
+        return game.get_board()
+    width = game.get_grid_width()
+    packed = 0
+    for row in range(game.get_grid_height()):
+        for col in range(width):
+            value = game.get_tile(row, col)
+            if value not in bitboard.EXPONENTS:
+                raise OverflowError("tile %d does not fit in a packed board" % value)
+            exp = bitboard.EXPONENTS[value]
+            packed |= exp << ((row * width + col) * bitboard.CELL_BITS)
+    return packed
+
+class ExpectimaxPlayer:
+    """
+    Expectimax search with a transposition table, chance node pruning
+    and an iterative deepening time/depth budget.
+    """
+
+    def __init__(self, max_depth = 3, time_limit = None, prob_threshold = 0.0001):
+        """
+        max_depth: number of player moves to look ahead
+        time_limit: seconds allowed per move, or None for depth only
+        prob_threshold: chance nodes reached with a lower probability
+                        are evaluated with the heuristic instead
+        """
+        self._max_depth = max_depth
+        self._time_limit = time_limit
+        self._prob_threshold = prob_threshold
+        self._height = 0
+        self._width = 0
+        self._row_scores = None
+        self._col_scores = None
+        self._table = {}
+        self._deadline = None
+        self._nodes = 0
+        self._cache_lookups = 0
+        self._cache_hits = 0
+        self._elapsed = 0.0
+        self._moves = 0
+        self._depth_reached = 0
+
+    def _set_shape(self, height, width):
+        """
+        Prepare line score caches for the given grid shape.
+        """
+        if (height, width) != (self._height, self._width):
+            self._height = height
+            self._width = width
+            self._row_scores = _LineScores(width)
+            self._col_scores = _LineScores(height)
+
+    def evaluate(self, board):
+        """
+        Heuristic value of a packed board.
+        """
+        value = 0.0
+        row_bits = self._width * bitboard.CELL_BITS
+        row_mask = (1 << row_bits) - 1
+        scores = self._row_scores
+        for row in range(self._height):
+            value += scores[(board >> (row * row_bits)) & row_mask]
+        columns = bitboard.transpose(board, self._height, self._width)
+        col_bits = self._height * bitboard.CELL_BITS
+        col_mask = (1 << col_bits) - 1
+        scores = self._col_scores
+        for col in range(self._width):
+            value += scores[(columns >> (col * col_bits)) & col_mask]
+        return value
+
+    def _tick(self):
+        """
+        Count a node and enforce the deadline.
+        """
+        self._nodes += 1
+        if (self._deadline is not None and self._nodes % CLOCK_INTERVAL == 0
+                and time.time() > self._deadline):
+            raise _Timeout()
+
+    def _max_node(self, board, depth, prob):
+        """
+        Value of the best move from board, -LOST_PENALTY if none is legal.
+        """
+        self._tick()
+        best = -LOST_PENALTY
+        for direction in DIRECTIONS:
+            child = bitboard.shift_board(board, direction, self._height, self._width)
+            if child != board:
+                value = self._chance_node(child, depth - 1, prob)
+                if value > best:
+                    best = value
+        return best
+
+    def _chance_node(self, board, depth, prob):
+        """
+        Expected value over all tile spawns on board.
+        """
+        if depth <= 0 or prob < self._prob_threshold:
+            return self.evaluate(board)
+        self._cache_lookups += 1
+        entry = self._table.get(board)
+        if entry is not None and entry[0] >= depth:
+            self._cache_hits += 1
+            return entry[1]
+        self._tick()
+        empty = bitboard.empty_cells(board, self._height * self._width)
+        if not empty:
+            return self.evaluate(board)
+        total = 0.0
+        for exp, spawn_prob in SPAWNS:
+            child_prob = prob * spawn_prob / len(empty)
+            for idx in empty:
+                child = board | (exp << (idx * bitboard.CELL_BITS))
+                total += spawn_prob * self._max_node(child, depth, child_prob)
+        value = total / len(empty)
+        self._table[board] = (depth, value)
+        return value
+
+    def _search_root(self, board, depth):
+        """
+        Return the best direction at board for a fixed depth, or None.
+        """
+        best_move = None
+        best = None
+        for direction in DIRECTIONS:
+            child = bitboard.shift_board(board, direction, self._height, self._width)
+            if child != board:
+                value = self._chance_node(child, depth - 1, 1.0)
+                if best is None or value > best:
+                    best = value
+                    best_move = direction
+        return best_move
+
+    def get_move(self, game):
+        """
+        Choose a direction for the current position of game.
+        Returns None if no move changes the board.
+        """
+        self._set_shape(game.get_grid_height(), game.get_grid_width())
+        board = board_from_game(game)
+        start = time.time()
+        self._table = {}
+        self._deadline = None
+        best_move = self._search_root(board, 1)
+        self._depth_reached = 1
+        if self._time_limit is not None:
+            self._deadline = start + self._time_limit
+        try:
+            for depth in range(2, self._max_depth + 1):
+                best_move = self._search_root(board, depth)
+                self._depth_reached = depth
+        except _Timeout:
+            pass
+        self._deadline = None
+        self._elapsed += time.time() - start
+        self._moves += 1
+        return best_move
+
+    def get_stats(self):
+        """
+        Return a dictionary of search counters accumulated so far.
+        """
+        if self._elapsed > 0:
+            nodes_per_sec = self._nodes / self._elapsed
+        else:
+            nodes_per_sec = 0.0
+        if self._cache_lookups > 0:
+            hit_rate = float(self._cache_hits) / self._cache_lookups
+        else:
+            hit_rate = 0.0
+        return {"moves": self._moves,
+                "nodes": self._nodes,
+                "elapsed": self._elapsed,
+                "nodes_per_sec": nodes_per_sec,
+                "cache_lookups": self._cache_lookups,
+                "cache_hits": self._cache_hits,
+                "cache_hit_rate": hit_rate,
+                "last_depth": self._depth_reached}
+
+    def reset_stats(self):
+        """
+        Clear the search counters.
+        """
+        self._nodes = 0
+        self._cache_lookups = 0
+        self._cache_hits = 0
+        self._elapsed = 0.0
+        self._moves = 0
+
+def play_game(game, player, max_moves = None):
+    """
+    Reset game and let player move until no move changes the board.
+    Returns the number of moves made.
+    """
+    game.reset()
+    moves = 0
+    while max_moves is None or moves < max_moves:
+        direction = player.get_move(game)
+        if direction is None:
+            break
+        game.move(direction)
+        moves += 1
+    return moves
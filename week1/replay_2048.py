@@ -0,0 +1,84 @@
+"""
+Replay logs for 2048
+
+A log holds one game per line: the grid size, the random seed the game
+was played with, the engine that played it and one letter per move, for
+example
+
+    4 4 1234 bitboard LLURDDL
+
+The engines pick spawn squares from the random module differently, so a
+seed only reproduces a game on the engine that played it.  Lines without
+an engine were written by the list engine.  Replaying reseeds the random
+module and feeds the moves back in, which reproduces every tile spawn
+exactly.
+"""
+
+import random
+
+import bitboard_2048 as bitboard
+
+ENGINE = __import__("2048")
+
+ENGINES = {"list": ENGINE.TwentyFortyEight,
+           "bitboard": bitboard.BitboardTwentyFortyEight}
+
+DEFAULT_ENGINE = "list"
+
+MOVE_CODES = {ENGINE.UP: "U",
+              ENGINE.DOWN: "D",
+              ENGINE.LEFT: "L",
+              ENGINE.RIGHT: "R"}
+
+CODE_MOVES = dict([(code, direction) for direction, code in MOVE_CODES.items()])
+
+def seeded_game(grid_height, grid_width, seed, game_class = None):
+    """
+    Seed the random module and return a freshly reset game.
+    The game must be the only user of the random module until it ends
+    for its replay to match.
+    """
+    if game_class is None:
+        game_class = ENGINE.TwentyFortyEight
+    random.seed(seed)
+    game = game_class(grid_height, grid_width)
+    game.reset()
+    return game
+
+def write_game(log_file, grid_height, grid_width, seed, directions,
+               engine = DEFAULT_ENGINE):
+    """
+    Append a whole game, played by the named engine, to a replay log.
+    """
+    log_file.write("%d %d %d %s %s\n" % (grid_height, grid_width, seed, engine,
+                                         "".join([MOVE_CODES[direction]
+                                                  for direction in directions])))
+
+def read_games(log_file):
+    """
+    Yield (height, width, seed, directions, engine) for every game in a log.
+    """
+    for line in log_file:
+        fields = line.split()
+        if not fields:
+            continue
+        engine = DEFAULT_ENGINE
+        if len(fields) > 3 and fields[3] in ENGINES:
+            engine = fields[3]
+            del fields[3]
+        moves = ""
+        if len(fields) > 3:
+            moves = fields[3]
+        yield (int(fields[0]), int(fields[1]), int(fields[2]),
+               [CODE_MOVES[code] for code in moves], engine)
+
+def replay(grid_height, grid_width, seed, directions, engine = DEFAULT_ENGINE):
+    """
+    Replay a logged game on the named engine and return it in its
+    final state.
+    """
+    game = seeded_game(grid_height, grid_width, seed, ENGINES[engine])
+    move = game.move
+    for direction in directions:
+        move(direction)
+    return game
@@ -0,0 +1,189 @@
+"""
+Headless 2048 runner
+
+Plays games without the GUI and writes one JSON object per game to
+standard output, followed by a summary line.
+
+    python run_2048.py --games 100 --policy expectimax --processes 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+import bitboard_2048 as bitboard
+import expectimax_2048 as expectimax
+import replay_2048 as replay
+
+ENGINES = replay.ENGINES
+
+class RandomPolicy:
+    """
+    Pick a legal direction uniformly at random.
+    Uses its own generator so the tile spawns stay replayable.
+    """
+
+    def __init__(self, seed = None):
+        self._rng = random.Random(seed)
+
+    def get_move(self, game):
+        """
+        Return a direction, or None if the game is over.
+        """
+        legal = game.legal_moves()
+        if not legal:
+            return None
+        return self._rng.choice(legal)
+
+class GreedyPolicy:
+    """
+    Pick the direction that leaves the most empty squares.
+    """
+
+    def get_move(self, game):
+        """
+        Return a direction, or None if the game is over.
+        """
+        height = game.get_grid_height()
+        width = game.get_grid_width()
+        board = expectimax.board_from_game(game)
+        best_move = None
+        best = -1
+        for direction in expectimax.DIRECTIONS:
+            child = bitboard.shift_board(board, direction, height, width)
+            if child != board:
+                empty = len(bitboard.empty_cells(child, height * width))
+                if empty > best:
+                    best = empty
+                    best_move = direction
+        return best_move
+
+def make_policy(options, seed):
+    """
+    Build the policy named in the command line options.
+    """
+    if options.policy == "random":
+        return RandomPolicy(seed)
+    if options.policy == "greedy":
+        return GreedyPolicy()
+    return expectimax.ExpectimaxPlayer(options.depth, options.time_limit)
+
+def play_game(game, policy, max_moves = None):
+    """
+    Play game with policy until it ends or max_moves have been made.
+    Returns (directions played, status), status being "game_over",
+    "max_moves" or "overflow" for a game stopped at a tile too large
+    for a packed board.
+    """
+    directions = []
+    try:
+        while max_moves is None or len(directions) < max_moves:
+            direction = policy.get_move(game)
+            if direction is None:
+                return directions, "game_over"
+            game.move(direction)
+            directions.append(direction)
+    except OverflowError:
+        # Raised by the bitboard engine, and by the greedy and expectimax
+        # policies when they pack a list engine board
+        return directions, "overflow"
+    return directions, "max_moves"
+
+def play_one(job):
+    """
+    Play a single game described by (game number, seed, options).
+    Returns a dictionary with the game's results.
+    """
+    number, seed, options = job
+    policy = make_policy(options, seed)
+    start = time.time()
+    game = replay.seeded_game(options.height, options.width, seed,
+                              ENGINES[options.engine])
+    directions, status = play_game(game, policy, options.max_moves)
+    result = {"game": number,
+              "seed": seed,
+              "status": status,
+              "moves": len(directions),
+              "score": game.get_score(),
+              "max_tile": game.get_max_tile(),
+              "seconds": time.time() - start}
+    if options.replay_log is not None:
+        result["directions"] = directions
+    return result
+
+def run(options, out = sys.stdout):
+    """
+    Play options.games games, writing a JSON line for each one and a
+    final summary line.  Returns the summary dictionary.
+    """
+    jobs = [(number, options.seed + number, options) for number in range(options.games)]
+    start = time.time()
+    if options.processes == 1:
+        results = map(play_one, jobs)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(options.processes)
+        results = pool.imap_unordered(play_one, jobs)
+    if options.replay_log is not None:
+        log_file = open(options.replay_log, "a")
+    total_moves = 0
+    total_score = 0
+    best_tile = 0
+    for result in results:
+        if options.replay_log is not None:
+            replay.write_game(log_file, options.height, options.width,
+                              result["seed"], result.pop("directions"), options.engine)
+        total_moves += result["moves"]
+        total_score += result["score"]
+        best_tile = max(best_tile, result["max_tile"])
+        out.write(json.dumps(result, sort_keys=True) + "\n")
+    if pool is not None:
+        pool.close()
+        pool.join()
+    if options.replay_log is not None:
+        log_file.close()
+    elapsed = time.time() - start
+    summary = {"summary": True,
+               "games": options.games,
+               "policy": options.policy,
+               "engine": options.engine,
+               "max_tile": best_tile,
+               "mean_score": float(total_score) / options.games,
+               "moves": total_moves,
+               "seconds": elapsed,
+               "games_per_sec": options.games / elapsed,
+               "moves_per_sec": total_moves / elapsed}
+    out.write(json.dumps(summary, sort_keys=True) + "\n")
+    return summary
+
+def parse_args(argv):
+    """
+    Parse the command line.
+    """
+    parser = argparse.ArgumentParser(description="Play 2048 without the GUI.")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--height", type=int, default=4)
+    parser.add_argument("--width", type=int, default=4)
+    parser.add_argument("--policy", choices=["random", "greedy", "expectimax"],
+                        default="random")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default=replay.DEFAULT_ENGINE,
+                        help="the bitboard engine stops games at tile %d"
+                        % bitboard.VALUES[bitboard.MAX_EXPONENT])
+    parser.add_argument("--depth", type=int, default=2,
+                        help="expectimax search depth")
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="expectimax seconds per move")
+    parser.add_argument("--max-moves", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0,
+                        help="game n is played with seed + n")
+    parser.add_argument("--replay-log", default=None,
+                        help="append every game to this replay log")
+    parser.add_argument("--processes", type=int,
+                        default=multiprocessing.cpu_count())
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    run(parse_args(sys.argv[1:]))
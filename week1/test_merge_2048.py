@@ -0,0 +1,107 @@
+"""
+Checks merge() and merge_with_score() in 2048.py against the original
+nested-loop merge on seeded random lines of length 1 to 64.
+
+    python test_merge_2048.py
+"""
+
+import random
+import unittest
+
+ENGINE = __import__("2048")
+
+# Random lines per length, and the tiles they are drawn from
+LINES_PER_LENGTH = 200
+TILES = [0, 0, 0, 2, 2, 4, 4, 8, 16]
+
+def reference_merge(line):
+    """
+    The original merge, with the merged tiles added up as the score.
+    Returns a tuple of the merged line and the score.
+    """
+    line = list(line)
+    temp_list = [0 for dummy_i in range(len(line))]
+    temp_list_i = 0
+    score = 0
+    zero_flag = True
+    for dummy_i in range(len(line) - 1):
+        zero_flag = True
+        if line[dummy_i] == 0:
+            continue
+        else:
+            for dummy_i_2 in range(dummy_i + 1, len(line)):
+                if line[dummy_i_2] == 0:
+                    continue
+                elif line[dummy_i] == line[dummy_i_2]:
+                    temp_list[temp_list_i] = line[dummy_i] + line[dummy_i_2]
+                    score += temp_list[temp_list_i]
+                    line[dummy_i_2] = 0
+                    temp_list_i += 1
+                    zero_flag = False
+                    break
+                elif line[dummy_i] != line[dummy_i_2]:
+                    temp_list[temp_list_i] = line[dummy_i]
+                    temp_list_i += 1
+                    zero_flag = False
+                    break
+            if zero_flag == True:
+                temp_list[temp_list_i] = line[dummy_i]
+                break
+    if zero_flag == False or line[-1] != 0:
+        temp_list[temp_list_i] = line[-1]
+    return temp_list, score
+
+def random_lines(seed):
+    """
+    Yield LINES_PER_LENGTH random lines of every length from 1 to 64.
+    """
+    rng = random.Random(seed)
+    for length in range(1, 65):
+        for dummy_line in range(LINES_PER_LENGTH):
+            yield [rng.choice(TILES) for dummy_idx in range(length)]
+
+class MergeTest(unittest.TestCase):
+    """
+    The one-pass merge must match the original on every line.
+    """
+
+    def test_merge(self):
+        """
+        merge() returns the original's merged line.
+        """
+        for line in random_lines(1):
+            self.assertEqual(ENGINE.merge(list(line)), reference_merge(line)[0], line)
+
+    def test_fresh_output(self):
+        """
+        A new output list, with the input left alone.
+        """
+        for line in random_lines(2):
+            original = list(line)
+            self.assertEqual(ENGINE.merge_with_score(line), reference_merge(original), original)
+            self.assertEqual(line, original)
+
+    def test_in_place(self):
+        """
+        Merging a line into itself.
+        """
+        for line in random_lines(3):
+            expected = reference_merge(line)
+            out, score = ENGINE.merge_with_score(line, line)
+            self.assertTrue(out is line)
+            self.assertEqual((out, score), expected)
+
+    def test_oversized_buffer(self):
+        """
+        A longer output list keeps its tail.
+        """
+        for line in random_lines(4):
+            expected = reference_merge(line)
+            out = [-1] * (len(line) + 5)
+            result, score = ENGINE.merge_with_score(line, out)
+            self.assertTrue(result is out)
+            self.assertEqual((out[:len(line)], score), expected)
+            self.assertEqual(out[len(line):], [-1] * 5)
+
+if __name__ == "__main__":
+    unittest.main()
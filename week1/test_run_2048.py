@@ -0,0 +1,62 @@
+"""
+Checks that run_2048.py stops a game at a tile too large for a packed
+board instead of failing the whole run.
+
+    python test_run_2048.py
+"""
+
+import unittest
+
+import bitboard_2048 as bitboard
+import expectimax_2048 as expectimax
+import replay_2048 as replay
+import run_2048 as run
+
+# One doubling past the largest tile a packed board holds
+TOO_LARGE = 2 * bitboard.VALUES[bitboard.MAX_EXPONENT]
+
+def list_game_with(value):
+    """
+    Return a 4x4 list engine game with value in the top left corner.
+    """
+    game = replay.seeded_game(4, 4, 0, replay.ENGINES["list"])
+    game.set_tile(0, 0, value)
+    return game
+
+class PlayGameTest(unittest.TestCase):
+    """
+    Tests for play_game.
+    """
+
+    def test_board_from_game(self):
+        """
+        Packing a tile past the largest value raises OverflowError.
+        """
+        self.assertRaises(OverflowError, expectimax.board_from_game,
+                          list_game_with(TOO_LARGE))
+
+    def test_greedy_overflow(self):
+        """
+        The greedy policy ends a list game holding the tile with "overflow".
+        """
+        directions, status = run.play_game(list_game_with(TOO_LARGE), run.GreedyPolicy())
+        self.assertEqual((directions, status), ([], "overflow"))
+
+    def test_expectimax_overflow(self):
+        """
+        So does the expectimax policy.
+        """
+        directions, status = run.play_game(list_game_with(TOO_LARGE),
+                                           expectimax.ExpectimaxPlayer(1))
+        self.assertEqual((directions, status), ([], "overflow"))
+
+    def test_random_list_game(self):
+        """
+        The random policy never packs the board, so the list game goes on.
+        """
+        directions, status = run.play_game(list_game_with(TOO_LARGE),
+                                           run.RandomPolicy(0), 5)
+        self.assertEqual((len(directions), status), (5, "max_moves"))
+
+if __name__ == "__main__":
+    unittest.main()
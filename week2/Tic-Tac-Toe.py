@@ -2,52 +2,77 @@
 Monte Carlo Tic-Tac-Toe Player
 """
 
+import math
 import random
-import poc_ttt_gui
+import time
 import poc_ttt_provided as provided
 
+# The GUI is only available inside CodeSkulptor
+try:
+    import poc_ttt_gui
+except ImportError:
+    poc_ttt_gui = None
+
+# Worker processes are not available inside CodeSkulptor
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
 # Constants for Monte Carlo simulator
 # Change as desired
 NTRIALS = 100  # Number of trials to run
 MCMATCH = 1.0  # Score for squares played by the machine player
 MCOTHER = 1.0  # Score for squares played by the other player
+TIME_LIMIT = 1.0   # Seconds mc_anytime_move may spend on a move
+NBATCH = 20        # Trials between stopping checks in mc_anytime_move
+CONFIDENCE = 2.58  # Standard errors that must separate the best square
+
+# Processes to spread the trials of mc_move over
+if multiprocessing is not None:
+    NWORKERS = multiprocessing.cpu_count()
+else:
+    NWORKERS = 1
 
 def mc_trial(board, player):
     """
     randomly play the game
+    playing the empty squares in one random order is the same as
+    picking a random empty square before every move
     """
-    while board.check_win() == None:
-        rand_square = random.randrange(len(board.get_empty_squares()))
-        board.move(board.get_empty_squares()[rand_square][0], board.get_empty_squares()[rand_square][1], player)
-        if board.get_empty_squares() != []:
-            player = provided.switch_player(player)
+    empty_squares = board.get_empty_squares()
+    random.shuffle(empty_squares)
+    for row, col in empty_squares:
+        if board.check_win() != None:
+            break
+        board.move(row, col, player)
+        player = provided.switch_player(player)
+
+def mc_deltas(board, player):
+    """
+    score change for each kind of square after a finished trial,
+    or None if the trial was drawn
+    """
+    winner = board.check_win()
+    if winner != provided.PLAYERX and winner != provided.PLAYERO:
+        return None
+    other = provided.switch_player(player)
+    if winner == player:
+        return {player: MCMATCH, other: -MCOTHER, provided.EMPTY: 0.0}
+    return {player: -MCMATCH, other: MCOTHER, provided.EMPTY: 0.0}
 
 def mc_update_scores(scores, board, player):
     """
     update the score board
     consider the status of player and winner
     """
+    # score change for each kind of square, worked out once per trial
+    deltas = mc_deltas(board, player)
+    if deltas is None:
+        return
     for row in range(board.get_dim()):
         for col in range(board.get_dim()):
-            if board.check_win() == provided.PLAYERX:       
-                if player == provided.PLAYERX and board.square(row, col) == provided.PLAYERX:
-                    scores[row][col] += MCMATCH 
-                elif player == provided.PLAYERX and board.square(row, col) == provided.PLAYERO:
-                    scores[row][col] -= MCOTHER
-                elif player == provided.PLAYERO and board.square(row, col) == provided.PLAYERX:
-                    scores[row][col] += MCOTHER
-                elif player == provided.PLAYERO and board.square(row, col) == provided.PLAYERO:
-                    scores[row][col] -= MCMATCH                 
-                
-            elif board.check_win() == provided.PLAYERO:
-                if player == provided.PLAYERX and board.square(row, col) == provided.PLAYERX:
-                    scores[row][col] -= MCMATCH 
-                elif player == provided.PLAYERX and board.square(row, col) == provided.PLAYERO:
-                    scores[row][col] += MCOTHER
-                elif player == provided.PLAYERO and board.square(row, col) == provided.PLAYERX:
-                    scores[row][col] -= MCOTHER
-                elif player == provided.PLAYERO and board.square(row, col) == provided.PLAYERO:
-                    scores[row][col] += MCMATCH
+            scores[row][col] += deltas[board.square(row, col)]
 
 def get_best_move(board, scores):
     """
@@ -66,20 +91,130 @@ def get_best_move(board, scores):
     #print highest_score_list
     return random.choice(highest_score_list)
             
-def mc_move(board, player, trials): 
+def mc_scores(board, player, trials):
     """
-    get best move
+    run trials from board and return the score board
     """
     scores = [ [0.0 for dummy_row in range(board.get_dim())] for dummy_col in range(board.get_dim())]      
+    # play every trial on one scratch board, reset from the start position
+    scratch_board = board.clone()
+    start = scratch_board.snapshot()
     for dummy_times in range(trials):
-        clone_board = board.clone()
-        mc_trial(clone_board, player)
-        mc_update_scores(scores, clone_board, player)
+        scratch_board.restore(start)
+        mc_trial(scratch_board, player)
+        mc_update_scores(scores, scratch_board, player)
+    return scores
+
+def mc_shard(job):
+    """
+    worker side of mc_move: job is (board, player, trials, seed)
+    every shard gets its own seed so the workers draw independent games
+    """
+    board, player, trials, seed = job
+    random.seed(seed)
+    return mc_scores(board, player, trials)
+
+_POOL = []
+
+def get_pool():
+    """
+    return the worker pool, started on first use and then reused
+    """
+    if not _POOL:
+        _POOL.append(multiprocessing.Pool(NWORKERS))
+    return _POOL[0]
+
+def mc_parallel_scores(board, player, trials):
+    """
+    split the trials over NWORKERS processes and add up their score boards
+    """
+    shards = [trials // NWORKERS + (worker < trials % NWORKERS) for worker in range(NWORKERS)]
+    jobs = [(board, player, shard, random.getrandbits(32)) for shard in shards if shard > 0]
+    scores = [ [0.0 for dummy_row in range(board.get_dim())] for dummy_col in range(board.get_dim())]
+    for partial in get_pool().map(mc_shard, jobs):
+        for row in range(board.get_dim()):
+            for col in range(board.get_dim()):
+                scores[row][col] += partial[row][col]
+    return scores
+
+def mc_move(board, player, trials): 
+    """
+    get best move
+    the trials run in the worker pool unless this is already a worker
+    process of another pool, which cannot start processes of its own
+    """
+    if NWORKERS > 1 and multiprocessing is not None \
+       and not multiprocessing.current_process().daemon:
+        scores = mc_parallel_scores(board, player, trials)
+    else:
+        scores = mc_scores(board, player, trials)
     return get_best_move(board, scores)
+
+def mc_anytime_move(board, player, time_limit = TIME_LIMIT, max_trials = None):
+    """
+    run trials in batches of NBATCH until time_limit seconds have passed,
+    max_trials have been played, or the best square leads the runner-up
+    by CONFIDENCE standard errors on both sides
+    never plays more than max_trials: the last batch is cut short
+    return (move, number of trials played)
+    """
+    empty_squares = board.get_empty_squares()
+    if len(empty_squares) == 1:
+        return empty_squares[0], 0
+    # per empty square: sum and sum of squares of its score changes
+    sums = [0.0] * len(empty_squares)
+    squares = [0.0] * len(empty_squares)
+    scratch_board = board.clone()
+    start = scratch_board.snapshot()
+    deadline = time.time() + time_limit
+    trials = 0
+    while max_trials is None or trials < max_trials:
+        batch = NBATCH
+        if max_trials is not None:
+            batch = min(NBATCH, max_trials - trials)
+        for dummy_times in range(batch):
+            scratch_board.restore(start)
+            mc_trial(scratch_board, player)
+            deltas = mc_deltas(scratch_board, player)
+            if deltas is not None:
+                for idx in range(len(empty_squares)):
+                    delta = deltas[scratch_board.square(empty_squares[idx][0], empty_squares[idx][1])]
+                    sums[idx] += delta
+                    squares[idx] += delta * delta
+        trials += batch
+        if time.time() >= deadline:
+            break
+        if trials >= 2 * NBATCH and mc_separated(sums, squares, trials):
+            break
+    highest = max(sums)
+    best = [empty_squares[idx] for idx in range(len(sums)) if sums[idx] == highest]
+    return random.choice(best), trials
+
+def mc_separated(sums, squares, trials):
+    """
+    check whether the confidence interval of the best mean score lies
+    entirely above that of the second best
+    """
+    bounds = []
+    for idx in range(len(sums)):
+        mean = sums[idx] / trials
+        variance = max(squares[idx] / trials - mean * mean, 0.0)
+        margin = CONFIDENCE * math.sqrt(variance / trials)
+        bounds.append((mean, mean - margin, mean + margin))
+    bounds.sort(reverse = True)
+    return bounds[0][1] > bounds[1][2]
+
+def mc_timed_move(board, player, trials):
+    """
+    mc_anytime_move with the mc_move contract, for the GUI and play_game:
+    trials is the most trials to play within TIME_LIMIT
+    """
+    return mc_anytime_move(board, player, TIME_LIMIT, trials)[0]
               
 # auto play
 # provided.play_game(mc_move, NTRIALS, False)
 
 # run the game        
-poc_ttt_gui.run_gui(3, provided.PLAYERX, mc_move, NTRIALS, False)
+if poc_ttt_gui is not None:
+    poc_ttt_gui.run_gui(3, provided.PLAYERX, mc_move, NTRIALS, False)
 
@@ -0,0 +1,115 @@
+"""
+Batched NumPy Monte Carlo scoring for Tic-Tac-Toe
+
+Plays many random trials from one position at once and scores them with
+array operations.  The scoring rules are the same as mc_update_scores in
+Tic-Tac-Toe.py.
+"""
+
+import numpy as np
+import poc_ttt_provided as provided
+
+# Same defaults as Tic-Tac-Toe.py
+MCMATCH = 1.0  # Score for squares played by the machine player
+MCOTHER = 1.0  # Score for squares played by the other player
+
+# Step recorded for a player that never completes a line
+_NEVER = np.iinfo(np.int64).max
+
+_LINES = {}
+
+def get_lines(dim):
+    """
+    Return a (2 * dim + 2, dim) array of the flat square indices of
+    every row, column and diagonal.
+    """
+    if dim not in _LINES:
+        dimrng = range(dim)
+        lines = [[row * dim + col for col in dimrng] for row in dimrng]
+        lines.extend([[row * dim + col for row in dimrng] for col in dimrng])
+        lines.append([idx * dim + idx for idx in dimrng])
+        lines.append([idx * dim + dim - idx - 1 for idx in dimrng])
+        _LINES[dim] = np.array(lines)
+    return _LINES[dim]
+
+def board_array(board):
+    """
+    Return the squares of a board as a flat array of player constants.
+    """
+    dim = board.get_dim()
+    return np.array([board.square(row, col) for row in range(dim) for col in range(dim)])
+
+def find_winners(finals, dim, reverse = False):
+    """
+    Return the result of every trial in a (trials, dim, dim) array of
+    final boards: PLAYERX, PLAYERO, DRAW, or 0 for games in progress.
+    """
+    flat = finals.reshape(finals.shape[0], -1)
+    lines = flat[:, get_lines(dim)]
+    xwins = (lines == provided.PLAYERX).all(axis=2).any(axis=1)
+    owins = (lines == provided.PLAYERO).all(axis=2).any(axis=1)
+    full = (flat != provided.EMPTY).all(axis=1)
+    winners = np.where(full, provided.DRAW, 0)
+    if reverse:
+        xwins, owins = owins, xwins
+    winners = np.where(owins, provided.PLAYERO, winners)
+    return np.where(xwins, provided.PLAYERX, winners)
+
+def score_trials(finals, winners, player, mcmatch = MCMATCH, mcother = MCOTHER):
+    """
+    Add up the mc_update_scores contributions of many trials.
+    finals is a (trials, dim, dim) array of final boards and winners the
+    result of each trial.  Returns a (dim, dim) array of scores.
+    """
+    other = provided.switch_player(player)
+    # +1 for trials player won, -1 for trials it lost, 0 otherwise
+    sign = (winners == player).astype(float) - (winners == other)
+    # square value when player wins: own squares gain, the other's lose
+    values = (finals == player) * mcmatch - (finals == other) * mcother
+    return np.tensordot(sign, values, axes=1)
+
+def random_trials(board, player, trials, rng = np.random):
+    """
+    Play trials random games from board, player moving first.
+    Returns (finals, winners): a (trials, dim, dim) array of final boards
+    and the result of each game.
+    """
+    dim = board.get_dim()
+    start = board_array(board)
+    if board.check_win() is not None:
+        finals = np.tile(start.reshape(dim, dim), (trials, 1, 1))
+        return finals, np.array([board.check_win()] * trials)
+    empty = np.nonzero(start == provided.EMPTY)[0]
+    # step at which each empty square is played in each trial: a
+    # random permutation, the same as picking uniformly every move
+    steps = np.argsort(rng.random_sample((trials, len(empty))), axis=1).argsort(axis=1)
+    owners = np.where(steps % 2 == 0, player, provided.switch_player(player))
+    all_steps = np.full((trials, dim * dim), -1, dtype=np.int64)
+    all_steps[:, empty] = steps
+    all_owners = np.tile(start, (trials, 1))
+    all_owners[:, empty] = owners
+    # the game ends on the first step that completes a line
+    lines = get_lines(dim)
+    line_owners = all_owners[:, lines]
+    line_done = all_steps[:, lines].max(axis=2)
+    xdone = np.where((line_owners == provided.PLAYERX).all(axis=2), line_done, _NEVER).min(axis=1)
+    odone = np.where((line_owners == provided.PLAYERO).all(axis=2), line_done, _NEVER).min(axis=1)
+    end = np.minimum(xdone, odone)
+    finals = np.where(all_steps <= end[:, None], all_owners, provided.EMPTY)
+    winners = np.where(xdone < odone, provided.PLAYERX, provided.PLAYERO)
+    if board.is_reverse():
+        winners = np.where(winners == provided.PLAYERX, provided.PLAYERO, provided.PLAYERX)
+    winners = np.where(end == _NEVER, provided.DRAW, winners)
+    return finals.reshape(trials, dim, dim), winners
+
+def mc_move(board, player, trials):
+    """
+    Monte Carlo move using batched trials and scoring.
+    Same contract as mc_move in Tic-Tac-Toe.py.
+    """
+    finals, winners = random_trials(board, player, trials)
+    scores = score_trials(finals, winners, player)
+    empty = board.get_empty_squares()
+    best = max([scores[square] for square in empty])
+    ties = [square for square in empty if scores[square] == best]
+    return ties[np.random.randint(len(ties))]
@@ -0,0 +1,158 @@
+"""
+Benchmarks for the Monte Carlo Tic-Tac-Toe player in Tic-Tac-Toe.py
+
+    python bench_ttt.py
+
+Compares the current mc_move against the original clone-per-trial
+version on empty boards of several sizes, for both board classes, in
+normal and reverse (misere) games.  Then plays the MCTS player with a
+fraction of the trials against mc_move to compare their move quality.
+"""
+
+import imp
+import os
+import random
+import timeit
+
+import batch_ttt
+import bitboard_ttt
+import mcts_ttt
+import poc_ttt_provided as provided
+
+MC = imp.load_source("mc_ttt", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                            "Tic-Tac-Toe.py"))
+
+BOARDS = [("list", provided.TTTBoard),
+          ("bitboard", bitboard_ttt.BitboardTTTBoard)]
+
+def clone_trial(board, player):
+    """
+    The original mc_trial, rebuilding the empty square list three
+    times per move.  Kept for comparison only.
+    """
+    while board.check_win() == None:
+        rand_square = random.randrange(len(board.get_empty_squares()))
+        board.move(board.get_empty_squares()[rand_square][0], board.get_empty_squares()[rand_square][1], player)
+        if board.get_empty_squares() != []:
+            player = provided.switch_player(player)
+
+def clone_mc_move(board, player, trials):
+    """
+    The original mc_move, cloning the board for every trial.
+    """
+    scores = [[0.0 for dummy_row in range(board.get_dim())] for dummy_col in range(board.get_dim())]
+    for dummy_times in range(trials):
+        clone_board = board.clone()
+        clone_trial(clone_board, player)
+        MC.mc_update_scores(scores, clone_board, player)
+    return MC.get_best_move(board, scores)
+
+def trials_per_sec(mc_move_function, board, trials, rounds = 3):
+    """
+    Return the best trials/sec over a few calls of mc_move_function.
+    """
+    best = None
+    for dummy_round in range(rounds):
+        start = timeit.default_timer()
+        mc_move_function(board, provided.PLAYERX, trials)
+        rate = trials / (timeit.default_timer() - start)
+        if best is None or rate > best:
+            best = rate
+    return best
+
+def bench_mc_move(dims, trials, reverse = False):
+    """
+    Time both mc_move versions on empty boards.
+    Returns a list of result dictionaries.
+    """
+    results = []
+    for name, board_class in BOARDS:
+        for dim in dims:
+            board = board_class(dim, reverse)
+            results.append({"board": name,
+                            "dim": dim,
+                            "game": ["normal", "reverse"][reverse],
+                            "before": trials_per_sec(clone_mc_move, board, trials),
+                            "after": trials_per_sec(MC.mc_move, board, trials)})
+    return results
+
+def bench_engines(dims, trials, reverse = False):
+    """
+    Time one move of the other Monte Carlo engines on empty bitboards.
+    Returns a list of result dictionaries in moves/sec.
+    """
+    engines = [("mc_move", lambda: MC.mc_move),
+               ("batch", lambda: batch_ttt.mc_move),
+               ("mcts", lambda: mcts_ttt.MCTSPlayer().get_move)]
+    results = []
+    for name, make_engine in engines:
+        for dim in dims:
+            board = bitboard_ttt.BitboardTTTBoard(dim, reverse)
+            engine = make_engine()
+            start = timeit.default_timer()
+            engine(board, provided.PLAYERX, trials)
+            results.append({"engine": name,
+                            "dim": dim,
+                            "game": ["normal", "reverse"][reverse],
+                            "rate": 1.0 / (timeit.default_timer() - start)})
+    return results
+
+def play_match(players, dim, reverse = False):
+    """
+    Play one game on a dim x dim bitboard between the two
+    (move function, trials) players, the first one playing X.
+    Returns the result of check_win.
+    """
+    board = bitboard_ttt.BitboardTTTBoard(dim, reverse)
+    player = provided.PLAYERX
+    turn = 0
+    while board.check_win() == None:
+        move_function, trials = players[turn]
+        row, col = move_function(board, player, trials)
+        board.move(row, col, player)
+        player = provided.switch_player(player)
+        turn = 1 - turn
+    return board.check_win()
+
+def bench_quality(dims, mc_trials, mcts_trials, games, reverse = False, seed = 0):
+    """
+    Play the MCTS player with mcts_trials iterations per move against
+    mc_move with mc_trials, games times on each size, each side playing
+    X in half of the games.  Returns a list of result dictionaries with
+    the games won, drawn and lost by MCTS.
+    """
+    results = []
+    for dim in dims:
+        result = {"dim": dim,
+                  "game": ["normal", "reverse"][reverse],
+                  "mc_trials": mc_trials,
+                  "mcts_trials": mcts_trials,
+                  "wins": 0, "draws": 0, "losses": 0}
+        for number in range(games):
+            random.seed(seed + number)
+            mcts = (mcts_ttt.MCTSPlayer().get_move, mcts_trials)
+            monte_carlo = (MC.mc_move, mc_trials)
+            if number % 2 == 0:
+                winner = play_match([mcts, monte_carlo], dim, reverse)
+                mcts_player = provided.PLAYERX
+            else:
+                winner = play_match([monte_carlo, mcts], dim, reverse)
+                mcts_player = provided.PLAYERO
+            if winner == provided.DRAW:
+                result["draws"] += 1
+            elif winner == mcts_player:
+                result["wins"] += 1
+            else:
+                result["losses"] += 1
+        results.append(result)
+    return results
+
+if __name__ == "__main__":
+    for RESULT in bench_mc_move(range(3, 10), 200) + bench_mc_move(range(3, 7), 200, True):
+        print("%(board)-8s %(game)-7s %(dim)dx%(dim)d  before %(before)9.0f trials/s"
+              "  after %(after)9.0f trials/s" % RESULT)
+    for RESULT in bench_engines(range(3, 7), 200) + bench_engines(range(3, 7), 200, True):
+        print("%(engine)-8s %(game)-7s %(dim)dx%(dim)d  %(rate)9.1f moves/s" % RESULT)
+    for RESULT in bench_quality([5, 6], 1000, 500, 20):
+        print("mcts %(mcts_trials)d vs mc_move %(mc_trials)d  %(game)-7s %(dim)dx%(dim)d"
+              "  %(wins)d won %(draws)d drawn %(losses)d lost" % RESULT)
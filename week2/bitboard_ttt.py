@@ -0,0 +1,202 @@
+"""
+Bitmask Tic-Tac-Toe board
+
+Drop-in replacement for poc_ttt_provided.TTTBoard that stores the squares
+taken by each player as an integer bitmask, square (row, col) being bit
+row * dim + col.  Wins are found by testing precomputed line masks.
+"""
+
+import poc_ttt_provided as provided
+
+# Per dimension: (winning line masks, full board mask, square of each
+# bit, line masks through each bit)
+_GEOMETRY = {}
+
+def get_geometry(dim):
+    """
+    Return (line masks, full mask, squares, square masks) for boards of
+    size dim.  Computed once per dimension and shared by all boards.
+    """
+    if dim not in _GEOMETRY:
+        dimrng = range(dim)
+        # Same order as TTTBoard.check_win: rows, columns, diagonals
+        lines = [[(row, col) for col in dimrng] for row in dimrng]
+        lines.extend([[(row, col) for row in dimrng] for col in dimrng])
+        lines.append([(idx, idx) for idx in dimrng])
+        lines.append([(idx, dim - idx - 1) for idx in dimrng])
+        masks = []
+        for line in lines:
+            mask = 0
+            for row, col in line:
+                mask |= 1 << (row * dim + col)
+            masks.append(mask)
+        squares = [(idx // dim, idx % dim) for idx in range(dim * dim)]
+        square_masks = [[mask for mask in masks if mask & (1 << idx)]
+                        for idx in range(dim * dim)]
+        _GEOMETRY[dim] = (masks, (1 << (dim * dim)) - 1, squares, square_masks)
+    return _GEOMETRY[dim]
+
+class BitboardTTTBoard(object):
+    """
+    Class to represent a Tic-Tac-Toe board as two bitmasks.
+    """
+
+    __slots__ = ("_dim", "_reverse", "_masks", "_full", "_squares",
+                 "_square_masks", "_xbits", "_obits", "_winner")
+
+    def __init__(self, dim, reverse = False, board = None):
+        """
+        Initialize the board with the given dimension and whether or
+        not the game should be reversed.  board is an optional grid of
+        EMPTY/PLAYERX/PLAYERO constants to start from.
+        """
+        self._dim = dim
+        self._reverse = reverse
+        self._masks, self._full, self._squares, self._square_masks = get_geometry(dim)
+        self._xbits = 0
+        self._obits = 0
+        self._winner = None
+        if board is not None:
+            for row in range(dim):
+                for col in range(dim):
+                    if board[row][col] != provided.EMPTY:
+                        self.move(row, col, board[row][col])
+
+    def __getstate__(self):
+        """
+        Pickle support; classes with __slots__ need it.
+        """
+        return (self._dim, self._reverse, self.snapshot())
+
+    def __setstate__(self, state):
+        """
+        Restore from __getstate__.
+        """
+        dim, reverse, snapshot = state
+        self.__init__(dim, reverse)
+        self.restore(snapshot)
+
+    def __str__(self):
+        """
+        Human readable representation of the board.
+        """
+        rep = ""
+        for row in range(self._dim):
+            for col in range(self._dim):
+                rep += provided.STRMAP[self.square(row, col)]
+                if col == self._dim - 1:
+                    rep += "\n"
+                else:
+                    rep += " | "
+            if row != self._dim - 1:
+                rep += "-" * (4 * self._dim - 3)
+                rep += "\n"
+        return rep
+
+    def get_dim(self):
+        """
+        Return the dimension of the board.
+        """
+        return self._dim
+
+    def is_reverse(self):
+        """
+        Return True if the game is reversed (three in a row loses).
+        """
+        return self._reverse
+
+    def square(self, row, col):
+        """
+        Returns one of the three constants EMPTY, PLAYERX, or PLAYERO
+        that correspond to the contents of the board at position (row, col).
+        """
+        bit = 1 << (row * self._dim + col)
+        if self._xbits & bit:
+            return provided.PLAYERX
+        if self._obits & bit:
+            return provided.PLAYERO
+        return provided.EMPTY
+
+    def get_empty_squares(self):
+        """
+        Return a list of (row, col) tuples for all empty squares
+        """
+        squares = self._squares
+        empty = self._full & ~(self._xbits | self._obits)
+        result = []
+        while empty:
+            low = empty & -empty
+            result.append(squares[low.bit_length() - 1])
+            empty ^= low
+        return result
+
+    def move(self, row, col, player):
+        """
+        Place player on the board at position (row, col).
+        player should be either the constant PLAYERX or PLAYERO.
+        Does nothing if board square is not empty.
+        """
+        idx = row * self._dim + col
+        bit = 1 << idx
+        if (self._xbits | self._obits) & bit:
+            return
+        if player == provided.PLAYERX:
+            self._xbits |= bit
+            bits = self._xbits
+        else:
+            self._obits |= bit
+            bits = self._obits
+        if self._winner is None:
+            # Only lines through the new square can have been completed
+            for mask in self._square_masks[idx]:
+                if bits & mask == mask:
+                    if self._reverse:
+                        self._winner = provided.switch_player(player)
+                    else:
+                        self._winner = player
+                    break
+
+    def check_win(self):
+        """
+        Returns a constant associated with the state of the game
+            If PLAYERX wins, returns PLAYERX.
+            If PLAYERO wins, returns PLAYERO.
+            If game is drawn, returns DRAW.
+            If game is in progress, returns None.
+        The result is kept up to date by move(), so this is O(1).
+        """
+        if self._winner is not None:
+            return self._winner
+        if self._xbits | self._obits == self._full:
+            return provided.DRAW
+        return None
+
+    def clone(self):
+        """
+        Return a copy of the board.
+        """
+        copy = BitboardTTTBoard(self._dim, self._reverse)
+        copy._xbits = self._xbits
+        copy._obits = self._obits
+        copy._winner = self._winner
+        return copy
+
+    def get_state(self):
+        """
+        Return the board contents as an immutable TTTState.
+        """
+        return provided.TTTState(self._dim, self._reverse, self._xbits,
+                                 self._obits, self._winner)
+
+    def snapshot(self):
+        """
+        Return an immutable copy of the board contents for restore().
+        """
+        return (self._xbits, self._obits, self._winner)
+
+    def restore(self, snapshot):
+        """
+        Overwrite the board with a snapshot of a board of the same
+        dimension.
+        """
+        self._xbits, self._obits, self._winner = snapshot
@@ -0,0 +1,238 @@
+"""
+Monte Carlo Tree Search (UCT) Tic-Tac-Toe Player
+
+    player = MCTSPlayer(exploration = 1.4, time_limit = 0.5)
+    poc_ttt_gui.run_gui(5, provided.PLAYERX, player.get_move, 1000, False)
+
+get_move has the same (board, player, trials) contract as mc_move, so it
+can be used anywhere mc_move is.  The subtree under the chosen move is
+kept and reused on the next call when the new position follows from it.
+"""
+
+import math
+import random
+import time
+import poc_ttt_provided as provided
+
+# Result of a playout from the point of view of one player
+WIN = 1.0
+DRAW = 0.5
+LOSS = 0.0
+
+class _Node:
+    """
+    Search tree node for the position reached by playing move.
+    """
+
+    def __init__(self, parent, move, player):
+        """
+        player is the one who played move to reach this node.
+        """
+        self.parent = parent
+        self.move = move
+        self.player = player
+        self.children = []
+        self.untried = None
+        self.visits = 0
+        self.value = 0.0
+
+    def select_child(self, exploration):
+        """
+        Return the child with the highest UCT value.
+        """
+        log_visits = math.log(self.visits)
+        best = None
+        best_value = None
+        for child in self.children:
+            value = (child.value / child.visits
+                     + exploration * math.sqrt(log_visits / child.visits))
+            if best is None or value > best_value:
+                best = child
+                best_value = value
+        return best
+
+    def find_child(self, move):
+        """
+        Return the child reached by move, or None if not expanded.
+        """
+        for child in self.children:
+            if child.move == move:
+                return child
+        return None
+
+    def size(self):
+        """
+        Return the number of nodes in this subtree.
+        """
+        return 1 + sum([child.size() for child in self.children])
+
+def playout(board, player):
+    """
+    Play random moves on board until the game ends, player first.
+    Returns the result of check_win.
+    """
+    empty_squares = board.get_empty_squares()
+    random.shuffle(empty_squares)
+    for row, col in empty_squares:
+        if board.check_win() != None:
+            break
+        board.move(row, col, player)
+        player = provided.switch_player(player)
+    return board.check_win()
+
+class MCTSPlayer:
+    """
+    UCT search player that keeps its tree between moves.
+    """
+
+    def __init__(self, exploration = 1.4, time_limit = None):
+        """
+        exploration: UCT exploration constant
+        time_limit: seconds per move, or None to run a fixed number
+                    of iterations given by the trials argument
+        """
+        self._exploration = exploration
+        self._time_limit = time_limit
+        self._root = None
+        self._root_grid = None
+        self._root_reverse = None
+        self._iterations = 0
+        self._reused = 0
+
+    def _grid(self, board):
+        """
+        Return the board contents as a tuple of row tuples.
+        """
+        dim = board.get_dim()
+        return tuple([tuple([board.square(row, col) for col in range(dim)])
+                      for row in range(dim)])
+
+    def _find_root(self, grid, reverse, player):
+        """
+        Return the node of the kept tree for grid, or None.
+        The new position must follow from the old root by moves that
+        were already expanded, in the same kind of game.
+        """
+        old = self._root_grid
+        if self._root is None or len(old) != len(grid) or reverse != self._root_reverse:
+            return None
+        played = []
+        for row in range(len(grid)):
+            for col in range(len(grid)):
+                if old[row][col] != grid[row][col]:
+                    if old[row][col] != provided.EMPTY:
+                        return None
+                    played.append((row, col))
+        node = self._root
+        while played:
+            next_player = provided.switch_player(node.player)
+            child = None
+            for move in played:
+                if grid[move[0]][move[1]] == next_player:
+                    child = node.find_child(move)
+                    break
+            if child is None:
+                return None
+            played.remove(child.move)
+            node = child
+        if provided.switch_player(node.player) != player:
+            return None
+        return node
+
+    def _iterate(self, root, scratch, start):
+        """
+        Run one selection, expansion, playout and backup pass.
+        """
+        scratch.restore(start)
+        node = root
+        # Selection
+        while not node.untried and node.children:
+            node = node.select_child(self._exploration)
+            scratch.move(node.move[0], node.move[1], node.player)
+        # Expansion
+        if node.untried is None:
+            if scratch.check_win() == None:
+                node.untried = scratch.get_empty_squares()
+                random.shuffle(node.untried)
+            else:
+                node.untried = []
+        if node.untried:
+            move = node.untried.pop()
+            child = _Node(node, move, provided.switch_player(node.player))
+            node.children.append(child)
+            scratch.move(move[0], move[1], child.player)
+            node = child
+        # Playout
+        winner = playout(scratch, provided.switch_player(node.player))
+        # Backup
+        while node is not None:
+            node.visits += 1
+            if winner == node.player:
+                node.value += WIN
+            elif winner == provided.DRAW:
+                node.value += DRAW
+            else:
+                node.value += LOSS
+            node = node.parent
+
+    def get_move(self, board, player, trials):
+        """
+        Return the best move for player as a (row, col) tuple.
+        Runs trials iterations, or until the time limit if one was set.
+        Returns (-1, -1) if the board is full.
+        """
+        empty_squares = board.get_empty_squares()
+        if empty_squares == []:
+            return -1, -1
+        grid = self._grid(board)
+        root = self._find_root(grid, board.is_reverse(), player)
+        if root is None:
+            root = _Node(None, None, provided.switch_player(player))
+            self._reused = 0
+        else:
+            root.parent = None
+            self._reused = root.visits
+        scratch = board.clone()
+        start = scratch.snapshot()
+        iterations = 0
+        if self._time_limit is not None:
+            deadline = time.time() + self._time_limit
+            while iterations == 0 or time.time() < deadline:
+                self._iterate(root, scratch, start)
+                iterations += 1
+        else:
+            for dummy_trial in range(trials):
+                self._iterate(root, scratch, start)
+            iterations = trials
+        self._iterations = iterations
+        best = None
+        for child in root.children:
+            if best is None or child.visits > best.visits:
+                best = child
+        if best is None:
+            # The game is already over, any empty square will do
+            return empty_squares[0]
+        # Keep the chosen subtree for the next call
+        self._root = best
+        self._root_grid = self._grid_after(grid, best.move, player)
+        self._root_reverse = board.is_reverse()
+        return best.move
+
+    def _grid_after(self, grid, move, player):
+        """
+        Return grid with player on square move.
+        """
+        rows = [list(row) for row in grid]
+        rows[move[0]][move[1]] = player
+        return tuple([tuple(row) for row in rows])
+
+    def get_stats(self):
+        """
+        Return a dictionary describing the last search.
+        """
+        size = 0
+        if self._root is not None:
+            size = self._root.size()
+        return {"iterations": self._iterations,
+                "reused_visits": self._reused,
+                "kept_nodes": size}
@@ -13,11 +13,217 @@ STRMAP = {EMPTY: " ",
           PLAYERX: "X",
           PLAYERO: "O"}
 
-class TTTBoard:
+# Per dimension, the indices of the lines through each square:
+# rows are 0..dim-1, columns dim..2*dim-1, then the two diagonals.
+_SQUARE_LINES = {}
+
+def square_lines(dim):
+    """
+    Return a grid giving the list of line indices through each square.
+    """
+    if dim not in _SQUARE_LINES:
+        grid = []
+        for row in range(dim):
+            grid_row = []
+            for col in range(dim):
+                lines = [row, dim + col]
+                if row == col:
+                    lines.append(2 * dim)
+                if row + col == dim - 1:
+                    lines.append(2 * dim + 1)
+                grid_row.append(lines)
+            grid.append(grid_row)
+        _SQUARE_LINES[dim] = grid
+    return _SQUARE_LINES[dim]
+
+# Per dimension, the bitmasks of the lines through each square, square
+# (row, col) being bit row * dim + col.
+_SQUARE_MASKS = {}
+
+def square_masks(dim):
+    """
+    Return a list giving the line masks through each square by bit index.
+    """
+    if dim not in _SQUARE_MASKS:
+        lines = square_lines(dim)
+        masks = [0] * (2 * dim + 2)
+        for row in range(dim):
+            for col in range(dim):
+                for line in lines[row][col]:
+                    masks[line] |= 1 << (row * dim + col)
+        _SQUARE_MASKS[dim] = [[masks[line] for line in lines[idx // dim][idx % dim]]
+                              for idx in range(dim * dim)]
+    return _SQUARE_MASKS[dim]
+
+class TTTState(object):
+    """
+    Immutable, hashable Tic-Tac-Toe position, usable as a dictionary key.
+    The squares taken by each player are stored as integer bitmasks.
+    Has the read-only methods of TTTBoard; with_move() returns a new state.
+    """
+
+    __slots__ = ("_dim", "_reverse", "_xbits", "_obits", "_winner")
+
+    def __init__(self, dim, reverse = False, xbits = 0, obits = 0, winner = None):
+        """
+        Create the state with the given squares taken by each player.
+        winner is the result of the first line completed, if any.
+        """
+        self._dim = dim
+        self._reverse = reverse
+        self._xbits = xbits
+        self._obits = obits
+        self._winner = winner
+
+    def __eq__(self, other):
+        """
+        Equal if the same squares are taken on the same kind of board.
+        """
+        return (isinstance(other, TTTState) and self._xbits == other._xbits
+                and self._obits == other._obits and self._dim == other._dim
+                and self._reverse == other._reverse)
+
+    def __ne__(self, other):
+        """
+        Negation of __eq__.
+        """
+        return not self == other
+
+    def __hash__(self):
+        """
+        Hash consistent with __eq__.
+        """
+        return hash((self._xbits, self._obits, self._dim, self._reverse))
+
+    def __getstate__(self):
+        """
+        Pickle support; classes with __slots__ need it.
+        """
+        return (self._dim, self._reverse, self._xbits, self._obits, self._winner)
+
+    def __setstate__(self, state):
+        """
+        Restore from __getstate__.
+        """
+        self._dim, self._reverse, self._xbits, self._obits, self._winner = state
+
+    def __str__(self):
+        """
+        Human readable representation of the board.
+        """
+        rep = ""
+        for row in range(self._dim):
+            for col in range(self._dim):
+                rep += STRMAP[self.square(row, col)]
+                if col == self._dim - 1:
+                    rep += "\n"
+                else:
+                    rep += " | "
+            if row != self._dim - 1:
+                rep += "-" * (4 * self._dim - 3)
+                rep += "\n"
+        return rep
+
+    def get_dim(self):
+        """
+        Return the dimension of the board.
+        """
+        return self._dim
+
+    def is_reverse(self):
+        """
+        Return True if the game is reversed (three in a row loses).
+        """
+        return self._reverse
+
+    def get_bits(self):
+        """
+        Return the (PLAYERX, PLAYERO) square bitmasks.
+        """
+        return self._xbits, self._obits
+
+    def square(self, row, col):
+        """
+        Returns one of the three constants EMPTY, PLAYERX, or PLAYERO
+        that correspond to the contents of the board at position (row, col).
+        """
+        bit = 1 << (row * self._dim + col)
+        if self._xbits & bit:
+            return PLAYERX
+        if self._obits & bit:
+            return PLAYERO
+        return EMPTY
+
+    def get_empty_squares(self):
+        """
+        Return a list of (row, col) tuples for all empty squares
+        """
+        taken = self._xbits | self._obits
+        return [(idx // self._dim, idx % self._dim)
+                for idx in range(self._dim * self._dim) if not taken & (1 << idx)]
+
+    def with_move(self, row, col, player):
+        """
+        Return the state after player moves at position (row, col).
+        Returns this state if the square is not empty.
+        """
+        idx = row * self._dim + col
+        bit = 1 << idx
+        if (self._xbits | self._obits) & bit:
+            return self
+        xbits = self._xbits
+        obits = self._obits
+        if player == PLAYERX:
+            xbits |= bit
+            bits = xbits
+        else:
+            obits |= bit
+            bits = obits
+        winner = self._winner
+        if winner == None:
+            for mask in square_masks(self._dim)[idx]:
+                if bits & mask == mask:
+                    if self._reverse:
+                        winner = switch_player(player)
+                    else:
+                        winner = player
+                    break
+        return TTTState(self._dim, self._reverse, xbits, obits, winner)
+
+    def check_win(self):
+        """
+        Returns a constant associated with the state of the game
+            If PLAYERX wins, returns PLAYERX.
+            If PLAYERO wins, returns PLAYERO.
+            If game is drawn, returns DRAW.
+            If game is in progress, returns None.
+        """
+        if self._winner != None:
+            return self._winner
+        if self._xbits | self._obits == (1 << (self._dim * self._dim)) - 1:
+            return DRAW
+        return None
+
+    def get_state(self):
+        """
+        Return the state itself; it is immutable.
+        """
+        return self
+
+    def clone(self):
+        """
+        Return the state itself; it is immutable.
+        """
+        return self
+
+class TTTBoard(object):
     """
     Class to represent a Tic-Tac-Toe board.
     """
 
+    __slots__ = ("_dim", "_reverse", "_square_lines", "_line_counts",
+                 "_filled", "_winner", "_board")
+
     def __init__(self, dim, reverse = False, board = None):
         """
         Initialize the TTTBoard object with the given dimension and 
@@ -26,15 +232,36 @@ class TTTBoard:
  
         self._dim = dim
         self._reverse = reverse
-        if board == None:
-            # Create empty board
-            self._board = [[EMPTY for dummycol in range(dim)] 
-                           for dummyrow in range(dim)]
-        else:
+        self._square_lines = square_lines(dim)
+        # Squares taken by each player on every line, so that a move
+        # only has to look at the lines through its own square
+        self._line_counts = {PLAYERX: [0] * (2 * dim + 2),
+                             PLAYERO: [0] * (2 * dim + 2)}
+        self._filled = 0
+        self._winner = None
+        self._board = [[EMPTY for dummycol in range(dim)] 
+                       for dummyrow in range(dim)]
+        if board != None:
             # Copy board grid
-            self._board = [[board[row][col] for col in range(dim)] 
-                           for row in range(dim)]
-            
+            for row in range(dim):
+                for col in range(dim):
+                    if board[row][col] != EMPTY:
+                        self.move(row, col, board[row][col])
+
+    def __getstate__(self):
+        """
+        Pickle support; classes with __slots__ need it.
+        """
+        return (self._dim, self._reverse, self.snapshot())
+
+    def __setstate__(self, state):
+        """
+        Restore from __getstate__.
+        """
+        dim, reverse, snapshot = state
+        self.__init__(dim, reverse)
+        self.restore(snapshot)
+
     def __str__(self):
         """
         Human readable representation of the board.
@@ -58,6 +285,12 @@ class TTTBoard:
         """
         return self._dim
     
+    def is_reverse(self):
+        """
+        Return True if the game is reversed (three in a row loses).
+        """
+        return self._reverse
+
     def square(self, row, col):
         """
         Returns one of the three constants EMPTY, PLAYERX, or PLAYERO 
@@ -84,6 +317,15 @@ class TTTBoard:
         """
         if self._board[row][col] == EMPTY:
             self._board[row][col] = player
+            self._filled += 1
+            counts = self._line_counts[player]
+            for line in self._square_lines[row][col]:
+                counts[line] += 1
+                if counts[line] == self._dim and self._winner == None:
+                    if self._reverse:
+                        self._winner = switch_player(player)
+                    else:
+                        self._winner = player
 
     def check_win(self):
         """
@@ -92,37 +334,14 @@ class TTTBoard:
             If PLAYERO wins, returns PLAYERO.
             If game is drawn, returns DRAW.
             If game is in progress, returns None.
+        The result is kept up to date by move(), so this is O(1).
+        If both players have completed lines, the first one completed wins.
         """
-        board = self._board
-        dim = self._dim
-        dimrng = range(dim)
-        lines = []
-
-        # rows
-        lines.extend(board)
-
-        # cols
-        cols = [[board[rowidx][colidx] for rowidx in dimrng]
-                for colidx in dimrng]
-        lines.extend(cols)
-
-        # diags
-        diag1 = [board[idx][idx] for idx in dimrng]
-        diag2 = [board[idx][dim - idx -1] 
-                 for idx in dimrng]
-        lines.append(diag1)
-        lines.append(diag2)
-
-        # check all lines
-        for line in lines:
-            if len(set(line)) == 1 and line[0] != EMPTY:
-                if self._reverse:
-                    return switch_player(line[0])
-                else:
-                    return line[0]
+        if self._winner != None:
+            return self._winner
 
         # no winner, check for draw
-        if len(self.get_empty_squares()) == 0:
+        if self._filled == self._dim * self._dim:
             return DRAW
 
         # game is still in progress
@@ -132,7 +351,50 @@ class TTTBoard:
         """
         Return a copy of the board.
         """
-        return TTTBoard(self._dim, self._reverse, self._board)
+        copy = TTTBoard.__new__(TTTBoard)
+        copy._dim = self._dim
+        copy._reverse = self._reverse
+        copy._square_lines = self._square_lines
+        copy._line_counts = {PLAYERX: list(self._line_counts[PLAYERX]),
+                             PLAYERO: list(self._line_counts[PLAYERO])}
+        copy._filled = self._filled
+        copy._winner = self._winner
+        copy._board = [list(row) for row in self._board]
+        return copy
+
+    def get_state(self):
+        """
+        Return the board contents as an immutable TTTState.
+        """
+        xbits = 0
+        obits = 0
+        for row in range(self._dim):
+            for col in range(self._dim):
+                if self._board[row][col] == PLAYERX:
+                    xbits |= 1 << (row * self._dim + col)
+                elif self._board[row][col] == PLAYERO:
+                    obits |= 1 << (row * self._dim + col)
+        return TTTState(self._dim, self._reverse, xbits, obits, self._winner)
+
+    def snapshot(self):
+        """
+        Return an immutable copy of the board contents for restore().
+        """
+        return (tuple([tuple(row) for row in self._board]),
+                tuple(self._line_counts[PLAYERX]),
+                tuple(self._line_counts[PLAYERO]),
+                self._filled, self._winner)
+
+    def restore(self, snapshot):
+        """
+        Overwrite the board in place with a snapshot of a board of the
+        same dimension.
+        """
+        rows, xcounts, ocounts, self._filled, self._winner = snapshot
+        for row in range(self._dim):
+            self._board[row][:] = rows[row]
+        self._line_counts[PLAYERX][:] = xcounts
+        self._line_counts[PLAYERO][:] = ocounts
 
 def switch_player(player):
     """
@@ -2,18 +2,114 @@
 Mini-max Tic-Tac-Toe Player
 """
 
-import poc_ttt_gui
+import os
+import time
+import bitboard_ttt
+import book_ttt
 import poc_ttt_provided as provided
+import transposition_ttt as transposition
+
+# The GUI is only available inside CodeSkulptor
+try:
+    import poc_ttt_gui
+except ImportError:
+    poc_ttt_gui = None
+
+# Worker processes are not available inside CodeSkulptor
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
 
 # Set timeout, as mini-max can take a long time
-import codeskulptor
-codeskulptor.set_timeout(60)
+try:
+    import codeskulptor
+    codeskulptor.set_timeout(60)
+except ImportError:
+    pass
 
 # SCORING VALUES - DO NOT MODIFY
 SCORES = {provided.PLAYERX: 1,
           provided.DRAW: 0,
           provided.PLAYERO: -1}
 
+# Most positions kept by tt_move between calls
+TABLE_SIZE = 1 << 20
+
+# Processes to spread the root moves of parallel_move over
+if multiprocessing != None:
+    NWORKERS = multiprocessing.cpu_count()
+else:
+    NWORKERS = 1
+
+# Seconds id_move may spend on a move
+TIME_LIMIT = 1.0
+
+# id_move checks the clock once every this many positions
+CLOCK_INTERVAL = 256
+
+# Opening book used by mm_move if the file exists, see book_ttt.py
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ttt_book.bin")
+
+# Positions visited by the searches, for benchmarking
+SEARCH_NODES = [0]
+
+# Per dimension, the search order rank of every square
+_MOVE_RANKS = {}
+
+# Transposition table shared by tt_move calls, made on first use
+_TABLE = []
+
+# Worker pool of parallel_move and the root score bound its workers
+# share, made on first use
+_POOL = []
+_SHARED = []
+
+# Opening book, loaded on first use; holds None if there is no book
+_BOOK = []
+
+def get_book():
+    """
+    Return the opening book at BOOK_PATH, or None if there is none.
+    """
+    if not _BOOK:
+        if BOOK_PATH != None and os.path.exists(BOOK_PATH):
+            _BOOK.append(book_ttt.load_book(BOOK_PATH))
+        else:
+            _BOOK.append(None)
+    return _BOOK[0]
+
+def set_book(book):
+    """
+    Make mm_move use book, or always search if book is None.
+    """
+    _BOOK[:] = [book]
+
+def board_state(board):
+    """
+    Return the position on board as an immutable TTTState.  Boards
+    without get_state(), such as the original TTTBoard, are read square
+    by square; without is_reverse() they are taken to be normal games.
+    """
+    if hasattr(board, "get_state"):
+        return board.get_state()
+    dim = board.get_dim()
+    reverse = False
+    if hasattr(board, "is_reverse"):
+        reverse = board.is_reverse()
+    xbits = 0
+    obits = 0
+    for row in range(dim):
+        for col in range(dim):
+            if board.square(row, col) == provided.PLAYERX:
+                xbits |= 1 << (row * dim + col)
+            elif board.square(row, col) == provided.PLAYERO:
+                obits |= 1 << (row * dim + col)
+    winner = board.check_win()
+    if winner == provided.DRAW:
+        winner = None
+    return provided.TTTState(dim, reverse, xbits, obits, winner)
+
 def mm_move(board, player):
     """
     Make a move on the board.
@@ -21,26 +117,346 @@ def mm_move(board, player):
     Returns a tuple with two elements.  The first element is the score
     of the given board and the second element is the desired move as a
     tuple, (row, col).
+    Positions in the opening book are looked up instead of searched.
     """
-    copy_board = board.clone()
-    empty_squares = copy_board.get_empty_squares()
+    # search on immutable states rather than cloning a board per node
+    state = board_state(board)
+    book = get_book()
+    if book != None:
+        known = book.lookup(state, player)
+        if known != None:
+            return known
+    return mm_search(state, player)
+
+def mm_search(state, player):
+    """
+    Return (score, move) for player on state by plain mini-max search.
+    """
+    SEARCH_NODES[0] += 1
+    empty_squares = state.get_empty_squares()
     if empty_squares == []:
-        return SCORES[copy_board.check_win()], (-1, -1)
+        return SCORES[state.check_win()], (-1, -1)
     else:
         score = []
         for empty_square in empty_squares:
-            test_board = copy_board.clone()
-            test_board.move(empty_square[0], empty_square[1], player)
-            if test_board.check_win() != None:
-                score.append((SCORES[test_board.check_win()], empty_square))
+            test_state = state.with_move(empty_square[0], empty_square[1], player)
+            if test_state.check_win() != None:
+                score.append((SCORES[test_state.check_win()], empty_square))
             else:
-                move_rec = mm_move(test_board, provided.switch_player(player))
+                move_rec = mm_search(test_state, provided.switch_player(player))
                 score.append((move_rec[0], empty_square))
         if player == provided.PLAYERX:         
             return max(score)          
         else:
             return min(score)
+
+def order_moves(squares, dim):
+    """
+    Sort squares so that the ones on the most lines come first, and
+    among those the ones nearest the centre: centre, corners, edges.
+    """
+    if dim not in _MOVE_RANKS:
+        lines = provided.square_lines(dim)
+        middle = (dim - 1) / 2.0
+        _MOVE_RANKS[dim] = dict([((row, col), (-len(lines[row][col]),
+                                               abs(row - middle) + abs(col - middle)))
+                                 for row in range(dim) for col in range(dim)])
+    ranks = _MOVE_RANKS[dim]
+    return sorted(squares, key = lambda square: ranks[square])
+
+def ab_move(board, player):
+    """
+    Alpha-beta version of mm_move with the same return value.
+    Tries the strongest squares first and stops looking at a position
+    as soon as a win for the player to move is found.
+    """
+    return ab_search(board_state(board), player, -1, 1)
+
+def ab_search(state, player, alpha, beta):
+    """
+    Return (score, move) for player on state, searching only scores
+    between alpha and beta; scores outside are bounds, not exact.
+    """
+    SEARCH_NODES[0] += 1
+    empty_squares = state.get_empty_squares()
+    if empty_squares == []:
+        return SCORES[state.check_win()], (-1, -1)
+    best = None
+    for empty_square in order_moves(empty_squares, state.get_dim()):
+        test_state = state.with_move(empty_square[0], empty_square[1], player)
+        if test_state.check_win() != None:
+            score = SCORES[test_state.check_win()]
+        else:
+            score = ab_search(test_state, provided.switch_player(player), alpha, beta)[0]
+        if player == provided.PLAYERX:
+            if best == None or score > best[0]:
+                best = (score, empty_square)
+            alpha = max(alpha, score)
+        else:
+            if best == None or score < best[0]:
+                best = (score, empty_square)
+            beta = min(beta, score)
+        if alpha >= beta:
+            break
+    return best
             
+def tt_move(board, player, table = None):
+    """
+    Alpha-beta version of mm_move that remembers the positions it has
+    solved, up to symmetry, in a transposition table.  Uses a table of
+    TABLE_SIZE positions kept between calls unless one is given.
+    """
+    if table == None:
+        table = get_table()
+    return tt_search(board_state(board), player, -1, 1, table)
+
+def get_table():
+    """
+    Return the transposition table shared by tt_move calls.
+    """
+    if not _TABLE:
+        _TABLE.append(transposition.TranspositionTable(TABLE_SIZE))
+    return _TABLE[0]
+
+def tt_search(state, player, alpha, beta, table):
+    """
+    ab_search with a transposition table: stored exact scores are
+    returned at once, stored bounds narrow the window, and the stored
+    best move is tried first.
+    """
+    SEARCH_NODES[0] += 1
+    empty_squares = state.get_empty_squares()
+    if empty_squares == []:
+        return SCORES[state.check_win()], (-1, -1)
+    dim = state.get_dim()
+    key, symmetry = table.key(state, player)
+    entry = table.get(key)
+    ordered = order_moves(empty_squares, dim)
+    if entry != None:
+        kind, score, canonical_move = entry
+        move = transposition.from_canonical_move(canonical_move, symmetry, dim)
+        if kind == transposition.EXACT:
+            return score, move
+        elif kind == transposition.LOWER:
+            alpha = max(alpha, score)
+        else:
+            beta = min(beta, score)
+        if alpha >= beta:
+            return score, move
+        ordered.remove(move)
+        ordered.insert(0, move)
+    window = (alpha, beta)
+    best = None
+    for empty_square in ordered:
+        test_state = state.with_move(empty_square[0], empty_square[1], player)
+        if test_state.check_win() != None:
+            score = SCORES[test_state.check_win()]
+        else:
+            score = tt_search(test_state, provided.switch_player(player), alpha, beta, table)[0]
+        if player == provided.PLAYERX:
+            if best == None or score > best[0]:
+                best = (score, empty_square)
+            alpha = max(alpha, score)
+        else:
+            if best == None or score < best[0]:
+                best = (score, empty_square)
+            beta = min(beta, score)
+        if alpha >= beta:
+            break
+    if best[0] <= window[0]:
+        kind = transposition.UPPER
+    elif best[0] >= window[1]:
+        kind = transposition.LOWER
+    else:
+        kind = transposition.EXACT
+    table.put(key, kind, best[0], transposition.to_canonical_move(best[1], symmetry, dim))
+    return best
+
+def _init_worker(shared):
+    """
+    Give a worker process the root bound shared by the pool.
+    """
+    _SHARED[:] = [shared]
+
+def get_pool():
+    """
+    Return the worker pool, started on first use and then reused.
+    """
+    if not _POOL:
+        shared = multiprocessing.Value("i", 0)
+        _SHARED[:] = [shared]
+        _POOL.append(multiprocessing.Pool(NWORKERS, _init_worker, (shared,)))
+    return _POOL[0]
+
+def root_shard(job):
+    """
+    Worker side of parallel_move: job is (state, player, move).
+    Searches the position after move with a window just wide enough to
+    prove a score equal to the best root score found so far by any
+    worker, and shares its own score if better.  Returns (score, move,
+    exact), exact being False when the score only shows that move is
+    worse than one already found.
+    """
+    state, player, move = job
+    shared = _SHARED[0]
+    test_state = state.with_move(move[0], move[1], player)
+    if test_state.check_win() != None:
+        score = SCORES[test_state.check_win()]
+        exact = True
+    else:
+        # scores are whole numbers, so a window one past the bound
+        # still proves ties with it exactly
+        bound = shared.value
+        if player == provided.PLAYERX:
+            alpha, beta = bound - 1, 1
+        else:
+            alpha, beta = -1, bound + 1
+        score = tt_search(test_state, provided.switch_player(player),
+                          alpha, beta, get_table())[0]
+        exact = alpha < score < beta or score == beta == 1 or score == alpha == -1
+    if exact:
+        with shared.get_lock():
+            if player == provided.PLAYERX and score > shared.value:
+                shared.value = score
+            elif player == provided.PLAYERO and score < shared.value:
+                shared.value = score
+    return score, move, exact
+
+def parallel_move(board, player):
+    """
+    Version of tt_move that searches the root moves in NWORKERS worker
+    processes, each with its own transposition table.  Workers share
+    the best root score found so far, so later root moves are searched
+    with a narrower window.  Every move tying the best score is still
+    scored exactly, so the move returned does not depend on which worker
+    finishes first.  Returns the same (score, move) as mm_move.
+    """
+    state = board_state(board)
+    book = get_book()
+    if book != None:
+        known = book.lookup(state, player)
+        if known != None:
+            return known
+    empty_squares = order_moves(state.get_empty_squares(), state.get_dim())
+    if empty_squares == []:
+        return SCORES[state.check_win()], (-1, -1)
+    if NWORKERS <= 1 or multiprocessing == None:
+        return tt_move(board, player)
+    pool = get_pool()
+    # start outside the score range so the first results are exact
+    if player == provided.PLAYERX:
+        _SHARED[0].value = -2
+    else:
+        _SHARED[0].value = 2
+    jobs = [(state, player, empty_square) for empty_square in empty_squares]
+    results = {}
+    for score, move, exact in pool.imap_unordered(root_shard, jobs):
+        if exact:
+            results[move] = score
+    # pick in search order so that ties do not depend on timing
+    best = None
+    for empty_square in empty_squares:
+        if empty_square in results:
+            score = results[empty_square]
+            if (best == None or (player == provided.PLAYERX and score > best[0])
+                    or (player == provided.PLAYERO and score < best[0])):
+                best = (score, empty_square)
+    return best
+
+class _Timeout(Exception):
+    """
+    Raised inside id_move's search when the time budget runs out.
+    """
+    pass
+
+def line_heuristic(state):
+    """
+    Estimate a position in progress from PLAYERX's side, strictly
+    between -1 and 1 so that finished games always count for more.
+    Every line still open to only one player counts for that player,
+    three times more for each extra square taken; in reverse games
+    such lines count against their owner instead.
+    """
+    xbits, obits = state.get_bits()
+    value = 0.0
+    for mask in bitboard_ttt.get_geometry(state.get_dim())[0]:
+        xcount = bin(xbits & mask).count("1")
+        ocount = bin(obits & mask).count("1")
+        if ocount == 0 and xcount > 0:
+            value += 3 ** (xcount - 1)
+        elif xcount == 0 and ocount > 0:
+            value -= 3 ** (ocount - 1)
+    if state.is_reverse():
+        value = -value
+    return value / (1.0 + abs(value))
+
+def id_move(board, player, time_limit = TIME_LIMIT, heuristic = line_heuristic):
+    """
+    Iterative deepening version of mm_move for boards too big to solve.
+    Searches one ply, then two and so on until the game is solved or
+    time_limit seconds have passed, scoring positions at the depth
+    limit with heuristic(state).  Returns (score, move) from the
+    deepest search that finished; one ply is always searched.
+    """
+    deadline = time.time() + time_limit
+    state = board_state(board)
+    empty_squares = state.get_empty_squares()
+    best = dl_search(state, player, 1, -1, 1, heuristic, None)
+    try:
+        for depth in range(2, len(empty_squares) + 1):
+            if best[0] == 1 or best[0] == -1:
+                break
+            best = dl_search(state, player, depth, -1, 1, heuristic, deadline, best[1])
+    except _Timeout:
+        pass
+    return best
+
+def dl_search(state, player, depth, alpha, beta, heuristic, deadline, first = None):
+    """
+    ab_search stopped depth moves ahead, where positions in progress
+    are scored by heuristic.  Tries first before the other squares and
+    raises _Timeout after deadline unless it is None.
+    """
+    SEARCH_NODES[0] += 1
+    if (deadline != None and SEARCH_NODES[0] % CLOCK_INTERVAL == 0
+            and time.time() > deadline):
+        raise _Timeout()
+    empty_squares = state.get_empty_squares()
+    if empty_squares == []:
+        return SCORES[state.check_win()], (-1, -1)
+    ordered = order_moves(empty_squares, state.get_dim())
+    if first != None:
+        ordered.remove(first)
+        ordered.insert(0, first)
+    best = None
+    for empty_square in ordered:
+        test_state = state.with_move(empty_square[0], empty_square[1], player)
+        if test_state.check_win() != None:
+            score = SCORES[test_state.check_win()]
+        elif depth == 1:
+            score = heuristic(test_state)
+        else:
+            score = dl_search(test_state, provided.switch_player(player), depth - 1,
+                              alpha, beta, heuristic, deadline)[0]
+        if player == provided.PLAYERX:
+            if best == None or score > best[0]:
+                best = (score, empty_square)
+            alpha = max(alpha, score)
+        else:
+            if best == None or score < best[0]:
+                best = (score, empty_square)
+            beta = min(beta, score)
+        if alpha >= beta:
+            break
+    return best
+
+def id_wrapper(board, player, trials):
+    """
+    Wrapper to use id_move in the GUI, for boards of size 4 and up:
+    poc_ttt_gui.run_gui(5, provided.PLAYERO, id_wrapper, 1, False)
+    """
+    return id_move(board, player)[1]
+
 def move_wrapper(board, player, trials):
     """
     Wrapper to allow the use of the same infrastructure that was used
@@ -51,4 +467,5 @@ def move_wrapper(board, player, trials):
     return move[1]
 
 #provided.play_game(move_wrapper, 1, False)        
-poc_ttt_gui.run_gui(3, provided.PLAYERO, move_wrapper, 1, False)
+if poc_ttt_gui is not None:
+    poc_ttt_gui.run_gui(3, provided.PLAYERO, move_wrapper, 1, False)
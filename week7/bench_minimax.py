@@ -0,0 +1,99 @@
+"""
+Benchmarks for the mini-max Tic-Tac-Toe player in Tic-Tac-Toe.py
+
+    python bench_minimax.py --sizes 3 4 --time-limit 60
+
+Solves the empty board of each size with every search and reports the
+positions visited and the time taken.  The parallel search only counts
+the positions visited by the main process.  A search that runs past the time
+limit is stopped and reported with the positions visited so far.
+"""
+
+import argparse
+import imp
+import os
+import signal
+import sys
+import timeit
+
+import poc_ttt_provided as provided
+import transposition_ttt as transposition
+
+MM = imp.load_source("mm_ttt", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                            "Tic-Tac-Toe.py"))
+
+# Time the searches themselves, not opening book lookups
+MM.set_book(None)
+
+SEARCHES = [("minimax", MM.mm_move),
+            ("alphabeta", MM.ab_move),
+            ("table", lambda board, player:
+             MM.tt_move(board, player, transposition.TranspositionTable(MM.TABLE_SIZE))),
+            ("parallel", MM.parallel_move)]
+
+class _Timeout(Exception):
+    """
+    Raised by the alarm handler to stop a search.
+    """
+
+def _alarm(dummy_signum, dummy_frame):
+    """
+    Stop the running search.
+    """
+    raise _Timeout()
+
+def solve(search, board, player, time_limit):
+    """
+    Run search on board with an alarm after time_limit seconds.
+    Returns a dictionary with the result, positions and seconds.
+    """
+    MM.SEARCH_NODES[0] = 0
+    previous = signal.signal(signal.SIGALRM, _alarm)
+    signal.alarm(time_limit)
+    start = timeit.default_timer()
+    try:
+        result = search(board, player)
+        finished = True
+    except _Timeout:
+        result = None
+        finished = False
+    signal.alarm(0)
+    signal.signal(signal.SIGALRM, previous)
+    return {"result": result,
+            "finished": finished,
+            "nodes": MM.SEARCH_NODES[0],
+            "seconds": timeit.default_timer() - start}
+
+def bench_searches(sizes, time_limit, searches = SEARCHES):
+    """
+    Solve the empty board of every size with every search.
+    Returns a list of result dictionaries.
+    """
+    results = []
+    for dim in sizes:
+        for name, search in searches:
+            result = solve(search, provided.TTTBoard(dim), provided.PLAYERX, time_limit)
+            result["search"] = name
+            result["dim"] = dim
+            results.append(result)
+    return results
+
+def parse_args(argv):
+    """
+    Parse the command line.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the mini-max searches.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3, 4])
+    parser.add_argument("--time-limit", type=int, default=60,
+                        help="seconds before a search is stopped")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    OPTIONS = parse_args(sys.argv[1:])
+    for RESULT in bench_searches(OPTIONS.sizes, OPTIONS.time_limit):
+        if RESULT["finished"]:
+            RESULT["status"] = "score %d move %s" % (RESULT["result"][0], RESULT["result"][1])
+        else:
+            RESULT["status"] = "stopped after %d s" % OPTIONS.time_limit
+        print("%(search)-10s %(dim)dx%(dim)d %(nodes)12d positions %(seconds)9.2f s  %(status)s"
+              % RESULT)
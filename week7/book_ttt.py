@@ -0,0 +1,149 @@
+"""
+Perfect play opening book for Tic-Tac-Toe
+
+    python book_ttt.py ttt_book.bin
+
+Solves every position reachable from the empty board, X moving first,
+in both normal and reverse games, and writes the results to a binary
+file.  After a short header the file holds one table per kind of game
+with a byte for every position, indexed by the position read as a base
+3 number (square row * dim + col is digit row * dim + col, EMPTY 0,
+PLAYERX 1, PLAYERO 2).  A byte is 0 for positions not in the book, else
+(score + 2) << 4 | best square index, the score being the mini-max score
+of the position (1 X wins, 0 draw, -1 O wins).
+
+load_book() memory-maps the file, so lookups only read the pages used.
+"""
+
+import mmap
+import struct
+import sys
+
+import poc_ttt_provided as provided
+
+# magic, board dimension, number of tables
+HEADER = struct.Struct(">4sBB")
+MAGIC = b"TTTB"
+
+# Same values as Tic-Tac-Toe.py
+SCORES = {provided.PLAYERX: 1,
+          provided.DRAW: 0,
+          provided.PLAYERO: -1}
+
+# Tables in the file, by reverse flag
+GAMES = [False, True]
+
+def position_index(state):
+    """
+    Return the base 3 index of a position.
+    """
+    xbits, obits = state.get_bits()
+    index = 0
+    for idx in range(state.get_dim() * state.get_dim() - 1, -1, -1):
+        index *= 3
+        if xbits & (1 << idx):
+            index += 1
+        elif obits & (1 << idx):
+            index += 2
+    return index
+
+def player_to_move(state):
+    """
+    Return the player whose turn it is when X moves first.
+    """
+    xbits, obits = state.get_bits()
+    if bin(xbits).count("1") == bin(obits).count("1"):
+        return provided.PLAYERX
+    return provided.PLAYERO
+
+def solve(state, player, solved):
+    """
+    Return the mini-max score of state with player to move, recording
+    (score, best move) for every position in progress in solved.
+    """
+    if state.check_win() != None:
+        return SCORES[state.check_win()]
+    if state in solved:
+        return solved[state][0]
+    best = None
+    for row, col in state.get_empty_squares():
+        score = solve(state.with_move(row, col, player), provided.switch_player(player), solved)
+        if best == None or (player == provided.PLAYERX and score > best[0]) or \
+           (player == provided.PLAYERO and score < best[0]):
+            best = (score, (row, col))
+    solved[state] = best
+    return best[0]
+
+def build_table(dim, reverse):
+    """
+    Return the book table for one kind of game as a bytearray.
+    """
+    solved = {}
+    solve(provided.TTTState(dim, reverse), provided.PLAYERX, solved)
+    table = bytearray(3 ** (dim * dim))
+    for state, (score, (row, col)) in solved.items():
+        table[position_index(state)] = (score + 2) << 4 | (row * dim + col)
+    return table
+
+def write_book(path, dim = 3):
+    """
+    Solve both kinds of game and write the book to path.
+    """
+    book_file = open(path, "wb")
+    book_file.write(HEADER.pack(MAGIC, dim, len(GAMES)))
+    for reverse in GAMES:
+        book_file.write(build_table(dim, reverse))
+    book_file.close()
+
+class OpeningBook:
+    """
+    Read-only view of a book file.
+    """
+
+    def __init__(self, path):
+        """
+        Memory-map the book at path.
+        """
+        book_file = open(path, "rb")
+        self._map = mmap.mmap(book_file.fileno(), 0, access = mmap.ACCESS_READ)
+        book_file.close()
+        magic, self._dim, tables = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or tables != len(GAMES):
+            raise ValueError("%s is not a Tic-Tac-Toe book" % path)
+        self._size = 3 ** (self._dim * self._dim)
+
+    def get_dim(self):
+        """
+        Return the board dimension the book covers.
+        """
+        return self._dim
+
+    def lookup(self, state, player):
+        """
+        Return (score, move) for player to move on state, or None if
+        the position is not in the book.
+        """
+        if state.get_dim() != self._dim or player != player_to_move(state):
+            return None
+        offset = (HEADER.size + GAMES.index(state.is_reverse()) * self._size
+                  + position_index(state))
+        entry = struct.unpack_from("B", self._map, offset)[0]
+        if entry == 0:
+            return None
+        square = entry & 0xf
+        return (entry >> 4) - 2, (square // self._dim, square % self._dim)
+
+    def close(self):
+        """
+        Release the memory map.
+        """
+        self._map.close()
+
+def load_book(path):
+    """
+    Return an OpeningBook for the file at path.
+    """
+    return OpeningBook(path)
+
+if __name__ == "__main__":
+    write_book(sys.argv[1] if len(sys.argv) > 1 else "ttt_book.bin")
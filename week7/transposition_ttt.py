@@ -0,0 +1,170 @@
+"""
+Transposition table for Tic-Tac-Toe searches
+
+Positions are stored under a canonical key: the smallest encoding of the
+board over its eight rotations and reflections, so that symmetric
+positions share one entry.  Entries hold a score and whether it is exact
+or only a lower or upper bound, which is what alpha-beta search can
+prove, and the best move found.  The table keeps at most a fixed number
+of entries, dropping the least recently used.
+"""
+
+import collections
+
+# Kinds of stored score
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Per dimension: (per symmetry, per 8 bit chunk, the mapped bits of every
+# byte value; per symmetry, the square each square is mapped to; per
+# symmetry, the square mapped to each square)
+_SYMMETRIES = {}
+
+def get_symmetries(dim):
+    """
+    Return (byte tables, permutations, inverse permutations) for the
+    eight symmetries of a dim x dim board.  Square (row, col) is bit
+    row * dim + col, as in TTTState.
+    """
+    if dim not in _SYMMETRIES:
+        last = dim - 1
+        maps = [lambda row, col: (row, col),
+                lambda row, col: (col, last - row),
+                lambda row, col: (last - row, last - col),
+                lambda row, col: (last - col, row),
+                lambda row, col: (row, last - col),
+                lambda row, col: (last - row, col),
+                lambda row, col: (col, row),
+                lambda row, col: (last - col, last - row)]
+        perms = []
+        inverses = []
+        tables = []
+        for square_map in maps:
+            perm = [0] * (dim * dim)
+            for row in range(dim):
+                for col in range(dim):
+                    new_row, new_col = square_map(row, col)
+                    perm[row * dim + col] = new_row * dim + new_col
+            inverse = [0] * (dim * dim)
+            for idx in range(dim * dim):
+                inverse[perm[idx]] = idx
+            chunks = []
+            for base in range(0, dim * dim, 8):
+                chunk = []
+                for byte in range(256):
+                    bits = 0
+                    for offset in range(8):
+                        if byte & (1 << offset) and base + offset < dim * dim:
+                            bits |= 1 << perm[base + offset]
+                    chunk.append(bits)
+                chunks.append(chunk)
+            perms.append(perm)
+            inverses.append(inverse)
+            tables.append(chunks)
+        _SYMMETRIES[dim] = (tables, perms, inverses)
+    return _SYMMETRIES[dim]
+
+def _map_bits(chunks, bits):
+    """
+    Apply one symmetry, given as byte tables, to a bitmask.
+    """
+    result = 0
+    for chunk in chunks:
+        result |= chunk[bits & 0xff]
+        bits >>= 8
+    return result
+
+def canonical(xbits, obits, dim):
+    """
+    Return (key, symmetry): the smallest encoding of the position over
+    all symmetries, and the index of the symmetry giving it.
+    """
+    tables = get_symmetries(dim)[0]
+    shift = dim * dim
+    best = None
+    best_symmetry = 0
+    for symmetry in range(8):
+        chunks = tables[symmetry]
+        key = _map_bits(chunks, xbits) | (_map_bits(chunks, obits) << shift)
+        if best is None or key < best:
+            best = key
+            best_symmetry = symmetry
+    return best, best_symmetry
+
+def to_canonical_move(move, symmetry, dim):
+    """
+    Return move, a (row, col) tuple, as a square index in the
+    canonical position.
+    """
+    return get_symmetries(dim)[1][symmetry][move[0] * dim + move[1]]
+
+def from_canonical_move(index, symmetry, dim):
+    """
+    Return the (row, col) tuple of a canonical square index.
+    """
+    idx = get_symmetries(dim)[2][symmetry][index]
+    return idx // dim, idx % dim
+
+class TranspositionTable:
+    """
+    Bounded table of search results with least recently used eviction.
+    """
+
+    def __init__(self, size = 1 << 20):
+        """
+        size is the most entries kept.
+        """
+        self._size = size
+        self._entries = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self):
+        """
+        Return the number of entries.
+        """
+        return len(self._entries)
+
+    def key(self, state, player):
+        """
+        Return (key, symmetry) for player to move on state.
+        """
+        xbits, obits = state.get_bits()
+        code, symmetry = canonical(xbits, obits, state.get_dim())
+        return (code, player, state.get_dim(), state.is_reverse()), symmetry
+
+    def get(self, key):
+        """
+        Return the (kind, score, canonical move) entry for key, or None.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._entries[key] = entry
+        return entry
+
+    def put(self, key, kind, score, move):
+        """
+        Store an entry, dropping the least recently used one if full.
+        """
+        self._entries.pop(key, None)
+        self._entries[key] = (kind, score, move)
+        if len(self._entries) > self._size:
+            self._entries.popitem(last = False)
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        self._entries.clear()
+
+    def get_stats(self):
+        """
+        Return a dictionary of entries, hits and misses.
+        """
+        return {"entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses}
@@ -0,0 +1,215 @@
+"""
+Headless Tic-Tac-Toe tournament
+
+Plays every ordered pair of agents against each other without the GUI
+and writes one JSON object per game to standard output, followed by one
+summary line per agent with its win/draw/loss record, Elo rating and
+move latencies.
+
+    python ttt_tournament.py --agents mc mcts minimax --sizes 3 --games 20
+
+With --reverse the games are misere: completing a line loses.
+
+Minimax searches the whole game tree, so only use it on 3x3 boards;
+the iterative agent is the time-limited search for bigger ones.
+"""
+
+import argparse
+import imp
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import bitboard_ttt
+import poc_ttt_provided as provided
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WEEK2 = os.path.join(HERE, os.pardir, "week2")
+
+MINIMAX = imp.load_source("mm_ttt", os.path.join(HERE, "Tic-Tac-Toe.py"))
+MONTE_CARLO = imp.load_source("mc_ttt", os.path.join(WEEK2, "Tic-Tac-Toe.py"))
+MCTS = imp.load_source("mcts_ttt", os.path.join(WEEK2, "mcts_ttt.py"))
+
+BOARDS = {"list": provided.TTTBoard,
+          "bitboard": bitboard_ttt.BitboardTTTBoard}
+
+RESULTS = {provided.PLAYERX: "X",
+           provided.PLAYERO: "O",
+           provided.DRAW: "draw"}
+
+AGENTS = ["random", "mc", "mc_anytime", "mcts", "minimax", "iterative"]
+
+ELO_START = 1500.0
+ELO_K = 16.0
+
+def make_agent(name, seed):
+    """
+    Return a move function (board, player, trials) -> (row, col) for
+    the named agent.  Agents that keep state between moves get a fresh
+    instance for every game.
+    """
+    if name == "random":
+        rng = random.Random(seed)
+        return lambda board, player, trials: rng.choice(board.get_empty_squares())
+    if name == "mc":
+        return MONTE_CARLO.mc_move
+    if name == "mc_anytime":
+        return MONTE_CARLO.mc_timed_move
+    if name == "mcts":
+        return MCTS.MCTSPlayer().get_move
+    if name == "iterative":
+        return MINIMAX.id_wrapper
+    return MINIMAX.move_wrapper
+
+def play_one(job):
+    """
+    Play a single game described by (game number, seed, dim, X agent,
+    O agent, options).  Returns a dictionary with the game's results
+    and the time taken by every move of each player.
+    """
+    number, seed, dim, xname, oname, options = job
+    random.seed(seed)
+    agents = {provided.PLAYERX: make_agent(xname, seed),
+              provided.PLAYERO: make_agent(oname, seed + 1)}
+    latencies = {provided.PLAYERX: [], provided.PLAYERO: []}
+    board = BOARDS[options.board](dim, options.reverse)
+    player = provided.PLAYERX
+    while board.check_win() == None:
+        start = time.time()
+        row, col = agents[player](board, player, options.trials)
+        latencies[player].append(time.time() - start)
+        if board.square(row, col) != provided.EMPTY:
+            raise ValueError("%s played the taken square (%d, %d)"
+                             % (agents[player], row, col))
+        board.move(row, col, player)
+        player = provided.switch_player(player)
+    return {"game": number,
+            "seed": seed,
+            "dim": dim,
+            "x": xname,
+            "o": oname,
+            "reverse": options.reverse,
+            "winner": RESULTS[board.check_win()],
+            "x_latencies": latencies[provided.PLAYERX],
+            "o_latencies": latencies[provided.PLAYERO]}
+
+def percentile(values, fraction):
+    """
+    Return the value below which the given fraction of values lie.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(int(math.ceil(fraction * len(ordered))) - 1, 0)]
+
+def update_elo(ratings, xname, oname, xscore):
+    """
+    Apply one game to the ratings; xscore is 1, 0.5 or 0 for X.
+    """
+    expected = 1.0 / (1.0 + 10 ** ((ratings[oname] - ratings[xname]) / 400.0))
+    ratings[xname] += ELO_K * (xscore - expected)
+    ratings[oname] -= ELO_K * (xscore - expected)
+
+def summarize(results, agents):
+    """
+    Return one summary dictionary per agent from the game results,
+    rating the games in game number order.
+    """
+    stats = {}
+    ratings = {}
+    for name in agents:
+        stats[name] = {"wins": 0, "draws": 0, "losses": 0, "latencies": []}
+        ratings[name] = ELO_START
+    for result in sorted(results, key=lambda result: result["game"]):
+        xname, oname = result["x"], result["o"]
+        stats[xname]["latencies"].extend(result["x_latencies"])
+        stats[oname]["latencies"].extend(result["o_latencies"])
+        if result["winner"] == "X":
+            xscore = 1.0
+            stats[xname]["wins"] += 1
+            stats[oname]["losses"] += 1
+        elif result["winner"] == "O":
+            xscore = 0.0
+            stats[xname]["losses"] += 1
+            stats[oname]["wins"] += 1
+        else:
+            xscore = 0.5
+            stats[xname]["draws"] += 1
+            stats[oname]["draws"] += 1
+        update_elo(ratings, xname, oname, xscore)
+    summaries = []
+    for name in agents:
+        latencies = stats[name].pop("latencies")
+        summary = {"summary": True,
+                   "agent": name,
+                   "elo": ratings[name],
+                   "moves": len(latencies),
+                   "mean_latency": sum(latencies) / max(len(latencies), 1),
+                   "p99_latency": percentile(latencies, 0.99)}
+        summary.update(stats[name])
+        summaries.append(summary)
+    summaries.sort(key=lambda summary: -summary["elo"])
+    return summaries
+
+def run(options, out = sys.stdout):
+    """
+    Play options.games games for every ordered pair of agents and board
+    size, writing a JSON line for each game and a summary line for each
+    agent.  Returns the summaries.
+    """
+    jobs = []
+    for dim in options.sizes:
+        for xname in options.agents:
+            for oname in options.agents:
+                if xname != oname:
+                    for dummy_game in range(options.games):
+                        number = len(jobs)
+                        jobs.append((number, options.seed + 2 * number, dim,
+                                     xname, oname, options))
+    if options.processes == 1:
+        results = map(play_one, jobs)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(options.processes)
+        results = pool.imap_unordered(play_one, jobs)
+    finished = []
+    for result in results:
+        finished.append(result)
+        line = dict(result)
+        line["x_seconds"] = sum(line.pop("x_latencies"))
+        line["o_seconds"] = sum(line.pop("o_latencies"))
+        out.write(json.dumps(line, sort_keys=True) + "\n")
+    if pool is not None:
+        pool.close()
+        pool.join()
+    summaries = summarize(finished, options.agents)
+    for summary in summaries:
+        out.write(json.dumps(summary, sort_keys=True) + "\n")
+    return summaries
+
+def parse_args(argv):
+    """
+    Parse the command line.
+    """
+    parser = argparse.ArgumentParser(description="Play Tic-Tac-Toe agents against each other.")
+    parser.add_argument("--agents", choices=AGENTS, nargs="+",
+                        default=["random", "mc", "mcts"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3])
+    parser.add_argument("--games", type=int, default=10,
+                        help="games per ordered pair of agents and size")
+    parser.add_argument("--trials", type=int, default=MONTE_CARLO.NTRIALS,
+                        help="trials per move for the Monte Carlo agents")
+    parser.add_argument("--reverse", action="store_true",
+                        help="play misere games")
+    parser.add_argument("--board", choices=sorted(BOARDS), default="bitboard")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int,
+                        default=multiprocessing.cpu_count())
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    run(parse_args(sys.argv[1:]))